@@ -65,17 +65,20 @@ from gribapi import grib_context_set_logging as codes_context_set_logging
 from gribapi import grib_copy_namespace as codes_copy_namespace
 from gribapi import grib_count_in_file as codes_count_in_file
 from gribapi import grib_find_nearest as codes_grib_find_nearest
+from gribapi import grib_find_nearest_arrays as codes_grib_find_nearest_arrays
 from gribapi import grib_find_nearest_multiple as codes_grib_find_nearest_multiple
 from gribapi import grib_get as codes_get
 from gribapi import grib_get_api_version as codes_get_api_version
 from gribapi import grib_get_array as codes_get_array
 from gribapi import grib_get_data as codes_grib_get_data
+from gribapi import grib_get_data_arrays as codes_grib_get_data_arrays
 from gribapi import grib_get_double as codes_get_double
 from gribapi import grib_get_double_array as codes_get_double_array
 from gribapi import grib_get_double_element as codes_get_double_element
 from gribapi import grib_get_double_elements as codes_get_double_elements
 from gribapi import grib_get_elements as codes_get_elements
 from gribapi import grib_get_float_array as codes_get_float_array
+from gribapi import grib_get_key_type as codes_get_key_type
 from gribapi import grib_get_long as codes_get_long
 from gribapi import grib_get_long_array as codes_get_long_array
 from gribapi import grib_get_message as codes_get_message
@@ -110,6 +113,8 @@ from gribapi import grib_is_missing as codes_is_missing
 from gribapi import grib_iterator_delete as codes_grib_iterator_delete
 from gribapi import grib_iterator_new as codes_grib_iterator_new
 from gribapi import grib_iterator_next as codes_grib_iterator_next
+from gribapi import grib_key_type_cache_clear as codes_key_type_cache_clear
+from gribapi import grib_key_type_cache_info as codes_key_type_cache_info
 from gribapi import grib_keys_iterator_delete as codes_keys_iterator_delete
 from gribapi import grib_keys_iterator_get_name as codes_keys_iterator_get_name
 from gribapi import grib_keys_iterator_new as codes_keys_iterator_new
@@ -138,9 +143,11 @@ from gribapi import grib_set_debug as codes_set_debug
 from gribapi import grib_set_definitions_path as codes_set_definitions_path
 from gribapi import grib_set_double as codes_set_double
 from gribapi import grib_set_double_array as codes_set_double_array
+from gribapi import grib_set_float_array as codes_set_float_array
 from gribapi import grib_set_key_vals as codes_set_key_vals
 from gribapi import grib_set_long as codes_set_long
 from gribapi import grib_set_long_array as codes_set_long_array
+from gribapi import grib_set_many as codes_set_many
 from gribapi import grib_set_missing as codes_set_missing
 from gribapi import grib_set_samples_path as codes_set_samples_path
 from gribapi import grib_set_string as codes_set_string
@@ -273,6 +280,7 @@ __all__ = [
     "codes_get_float_array",
     "codes_get_gaussian_latitudes",
     "codes_get_library_path",
+    "codes_get_key_type",
     "codes_get_long_array",
     "codes_get_long",
     "codes_get_message_offset",
@@ -288,9 +296,11 @@ __all__ = [
     "codes_get_version_info",
     "codes_get",
     "codes_get_features",
+    "codes_grib_find_nearest_arrays",
     "codes_grib_find_nearest_multiple",
     "codes_grib_find_nearest",
     "codes_grib_get_data",
+    "codes_grib_get_data_arrays",
     "codes_grib_iterator_delete",
     "codes_grib_iterator_new",
     "codes_grib_iterator_next",
@@ -329,6 +339,8 @@ __all__ = [
     "codes_index_write",
     "codes_is_defined",
     "codes_is_missing",
+    "codes_key_type_cache_clear",
+    "codes_key_type_cache_info",
     "codes_keys_iterator_delete",
     "codes_keys_iterator_get_name",
     "codes_keys_iterator_new",
@@ -355,10 +367,12 @@ __all__ = [
     "codes_set_debug",
     "codes_set_definitions_path",
     "codes_set_double_array",
+    "codes_set_float_array",
     "codes_set_double",
     "codes_set_key_vals",
     "codes_set_long_array",
     "codes_set_long",
+    "codes_set_many",
     "codes_set_missing",
     "codes_set_samples_path",
     "codes_set_string_array",
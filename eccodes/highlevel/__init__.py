@@ -1,3 +1,15 @@
 from ._bufr import BUFRMessage  # noqa
+from .grid import Grid, NearestPlan  # noqa
+from .index import Index, IndexEntry, open_index, scan  # noqa
 from .message import GRIBMessage, Message  # noqa
-from .reader import FileReader, MemoryReader, StreamReader  # noqa
+from .parallel import ParallelReader, encode_many  # noqa
+from .reader import (  # noqa
+    AsyncStreamReader,
+    FileReader,
+    IndexedFileReader,
+    MappedFileReader,
+    MemoryReader,
+    StreamReader,
+    ThreadPoolReader,
+)
+from .writer import FileWriter  # noqa
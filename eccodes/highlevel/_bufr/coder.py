@@ -194,9 +194,9 @@ class Coder:
     #     extracted subsets. That's why it's important to use the subset count
     #     from the original handle, not the clone!
 
-    def get_buffer(self) -> bytes:
+    def get_buffer(self, copy=True) -> Union[bytes, memoryview]:
         self.pack()
-        bytes = codes_get_message(self._handle)
+        bytes = codes_get_message(self._handle, copy=copy)
         return bytes
 
     def get_bitmap(self) -> NDArray:
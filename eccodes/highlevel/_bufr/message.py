@@ -217,10 +217,14 @@ class Message(View):
             except NotFoundError:
                 self.data.set_missing(key)
 
-    def get_buffer(self) -> bytes:
-        """Returns a buffer containing the encoded message."""
+    def get_buffer(self, copy=True) -> Union[bytes, memoryview]:
+        """Returns a buffer containing the encoded message.
+
+        With `copy=False`, returns a read-only view of the encoded message,
+        which must not be used once the message is modified or deleted.
+        """
         self._commit()
-        return self._coder.get_buffer()
+        return self._coder.get_buffer(copy=copy)
 
     def as_dict(self, ranked=False, depth=0, **kwds) -> Dict:
         """Returns dict-like representation of the message items."""
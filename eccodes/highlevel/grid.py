@@ -0,0 +1,202 @@
+import collections
+import threading
+
+import numpy as np
+
+import eccodes
+
+
+class _LRUCache:
+    """Thread-safe, size-bounded LRU cache"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def grid_hash(message):
+    """Return the hash identifying the grid of a GRIB message"""
+    return eccodes.codes_get(message._handle, "md5GridSection", ktype=str)
+
+
+class Grid:
+    """Coordinates of the points of a grid
+
+    The arrays are read-only, as they are shared by all the messages on the
+    same grid (see :attr:`GRIBMessage.grid`).
+
+    Attributes
+    ----------
+    hash: str
+        Hash of the grid section of the messages on the grid
+    latitudes, longitudes: numpy.ndarray
+        Coordinates of the grid points
+    """
+
+    def __init__(self, hash, latitudes, longitudes):
+        self.hash = hash
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.latitudes.flags.writeable = False
+        self.longitudes.flags.writeable = False
+
+    def __len__(self):
+        return len(self.latitudes)
+
+
+_grids = _LRUCache(maxsize=8)
+
+
+def get_grid(message):
+    """Get the grid of a message, from the cache if available"""
+    key = grid_hash(message)
+    grid = _grids.get(key)
+    if grid is None:
+        lats, lons, _ = eccodes.codes_grib_get_data_arrays(
+            message._data_message()._handle
+        )
+        grid = Grid(key, lats, lons)
+        _grids.put(key, grid)
+    return grid
+
+
+class NearestPlan:
+    """Nearest grid points to a set of locations, for a given grid
+
+    Created by :meth:`GRIBMessage.nearest_plan`, and applied to any message on
+    the same grid with :meth:`apply`, which only gathers values.
+
+    Attributes
+    ----------
+    grid_hash: str
+        Hash of the grid section of the messages the plan applies to
+    index, lat, lon, distance: numpy.ndarray
+        Index, coordinates and distance of the nearest grid points, of shape
+        ``(n,)`` if ``npoints`` is 1, or ``(n, 4)`` if it is 4
+    """
+
+    def __init__(self, grid_hash, nearest):
+        self.grid_hash = grid_hash
+        self.index = nearest.index
+        self.lat = nearest.lat
+        self.lon = nearest.lon
+        self.distance = nearest.distance
+        for array in (self.index, self.lat, self.lon, self.distance):
+            array.flags.writeable = False
+        self.npoints = 1 if self.index.ndim == 1 else self.index.shape[1]
+        self._weights = None
+
+    @property
+    def weights(self):
+        """Inverse-distance weights of the nearest grid points
+
+        Grid points at a null distance get all the weight.
+        """
+        if self._weights is None:
+            distance = self.distance.reshape(len(self.distance), -1)
+            weights = _inverse_distance_weights(distance)
+            weights.flags.writeable = False
+            self._weights = weights.reshape(self.distance.shape)
+        return self._weights
+
+    def apply(self, source, weighted=False, missing_value=None):
+        """Get the values at the nearest grid points
+
+        Parameters
+        ----------
+        source: GRIBMessage or array-like
+            Message on the grid of the plan, or its array of values
+        weighted: bool
+            With 4 points, combine the values using inverse-distance weights.
+            Missing values are left out, and the weights of the other points
+            scaled up; if all 4 values are missing, so is the result
+        missing_value: float, optional
+            Value of the missing values, in addition to NaN. By default, the
+            ``missingValue`` of the message, if ``source`` is a message
+
+        Returns
+        -------
+        numpy.ndarray
+            Values, of shape ``(n,)``, or ``(n, 4)`` with 4 points and no
+            weighting
+
+        Raises
+        ------
+        ValueError
+            If the message is not on the grid of the plan
+        """
+        if hasattr(source, "_handle"):
+            if grid_hash(source) != self.grid_hash:
+                raise ValueError("Message is not on the grid of the plan")
+            if missing_value is None:
+                missing_value = source.get("missingValue")
+            source = source.data
+        values = np.asarray(source)[self.index]
+        if not weighted or self.npoints == 1:
+            return values
+        valid = np.ones(values.shape, dtype=bool)
+        if np.issubdtype(values.dtype, np.inexact):
+            valid &= ~np.isnan(values)
+        if missing_value is not None:
+            valid &= values != missing_value
+        if valid.all():
+            return (values * self.weights).sum(axis=1)
+        weights = _inverse_distance_weights(self.distance, valid)
+        result = (np.where(valid, values, 0) * weights).sum(axis=1)
+        result[~valid.any(axis=1)] = np.nan if missing_value is None else missing_value
+        return result
+
+
+def _inverse_distance_weights(distance, valid=None):
+    """Normalised inverse-distance weights, over the valid points of each row
+
+    Points at a null distance get all the weight of their row. Rows without
+    valid points get null weights.
+    """
+    exact = distance == 0
+    if valid is not None:
+        exact &= valid
+    with np.errstate(divide="ignore"):
+        weights = np.where(exact.any(axis=1, keepdims=True), exact, 1 / distance)
+    if valid is not None:
+        weights = np.where(valid, weights, 0)
+    total = weights.sum(axis=1, keepdims=True)
+    return weights / np.where(total == 0, 1, total)
+
+
+_nearest_plans = _LRUCache(maxsize=64)
+
+
+def nearest_plan(message, lats, lons, npoints=1):
+    """Get the plan of the nearest grid points of a message, from the cache
+    if available"""
+    lats = np.ascontiguousarray(lats, dtype=np.float64).ravel()
+    lons = np.ascontiguousarray(lons, dtype=np.float64).ravel()
+    key = (grid_hash(message), npoints, lats.tobytes(), lons.tobytes())
+    plan = _nearest_plans.get(key)
+    if plan is None:
+        plan = NearestPlan(key[0], message.nearest(lats, lons, npoints=npoints))
+        _nearest_plans.put(key, plan)
+    return plan
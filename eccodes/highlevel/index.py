@@ -0,0 +1,335 @@
+import collections
+import json
+import os
+
+import numpy as np
+
+import eccodes
+import gribapi
+from gribapi import ffi
+
+INDEX_SUFFIX = ".idx"
+
+DEFAULT_KEYS = {
+    eccodes.CODES_PRODUCT_GRIB: (
+        "shortName",
+        "typeOfLevel",
+        "level",
+        "dataDate",
+        "dataTime",
+        "step",
+        "number",
+    ),
+    eccodes.CODES_PRODUCT_BUFR: (),
+}
+
+_FORMAT = "eccodes-python-index"
+_VERSION = 1
+
+_KINDS = {
+    eccodes.CODES_PRODUCT_GRIB: "grib",
+    eccodes.CODES_PRODUCT_BUFR: "bufr",
+}
+
+IndexEntry = collections.namedtuple("IndexEntry", ["offset", "size", "header"])
+
+
+_DTYPES = {
+    gribapi.lib.GRIB_TYPE_LONG: np.int64,
+    gribapi.lib.GRIB_TYPE_DOUBLE: np.float64,
+    gribapi.lib.GRIB_TYPE_STRING: str,
+}
+
+_FILLS = {
+    gribapi.lib.GRIB_TYPE_LONG: 0,
+    gribapi.lib.GRIB_TYPE_DOUBLE: np.nan,
+    gribapi.lib.GRIB_TYPE_STRING: "",
+}
+
+_SUFFIX_TYPES = {
+    "int": gribapi.lib.GRIB_TYPE_LONG,
+    "float": gribapi.lib.GRIB_TYPE_DOUBLE,
+    "str": gribapi.lib.GRIB_TYPE_STRING,
+}
+
+
+class _KeyReader:
+    """Read scalar keys with a single typed getter call per key"""
+
+    def __init__(self):
+        self._long = ffi.new("long *")
+        self._double = ffi.new("double *")
+        self._type = ffi.new("int *")
+        self._length = ffi.new("size_t *")
+        self._string = ffi.new("char[]", 1024)
+
+    def native_type(self, h, name):
+        err = gribapi.lib.grib_get_native_type(h, name, self._type)
+        if err == gribapi.lib.GRIB_NOT_FOUND:
+            return None
+        gribapi.GRIB_CHECK(err)
+        if self._type[0] in (gribapi.lib.GRIB_TYPE_LONG, gribapi.lib.GRIB_TYPE_DOUBLE):
+            return self._type[0]
+        return gribapi.lib.GRIB_TYPE_STRING
+
+    def get(self, h, name, ktype):
+        """Get the value of a key, or ``None`` if not found or missing"""
+        lib = gribapi.lib
+        if ktype == lib.GRIB_TYPE_LONG:
+            err = lib.grib_get_long(h, name, self._long)
+            value = self._long[0]
+            missing = value == gribapi.GRIB_MISSING_LONG
+        elif ktype == lib.GRIB_TYPE_DOUBLE:
+            err = lib.grib_get_double(h, name, self._double)
+            value = self._double[0]
+            missing = value == gribapi.GRIB_MISSING_DOUBLE
+        else:
+            self._length[0] = len(self._string)
+            err = lib.grib_get_string(h, name, self._string, self._length)
+            if err == lib.GRIB_BUFFER_TOO_SMALL:
+                gribapi.GRIB_CHECK(lib.grib_get_length(h, name, self._length))
+                self._string = ffi.new("char[]", self._length[0])
+                err = lib.grib_get_string(h, name, self._string, self._length)
+            value = ffi.string(self._string, self._length[0]).decode(gribapi.ENC)
+            missing = False
+        if err == lib.GRIB_NOT_FOUND:
+            return None
+        gribapi.GRIB_CHECK(err)
+        return None if missing else value
+
+
+def _column(values, ktype):
+    if ktype is None:
+        return np.ma.masked_all(len(values))
+    dtype = _DTYPES[ktype]
+    mask = [value is None for value in values]
+    if not any(mask):
+        return np.array(values, dtype=dtype)
+    fill = _FILLS[ktype]
+    values = [fill if value is None else value for value in values]
+    return np.ma.masked_array(values, mask=mask, dtype=dtype)
+
+
+def scan(path, keys, kind=eccodes.CODES_PRODUCT_GRIB):
+    """Get the values of scalar header keys for all the messages of a file
+
+    Returns a ``dict`` mapping each key to an array with one element per
+    message. Keys can be suffixed with ":str", ":int", or ":float" to request a
+    specific type, otherwise their native type in the first message defining
+    them is used. Arrays are masked where the key is not defined, or missing.
+
+    GRIB messages are read headers only, so the keys of the data section are
+    not available.
+    """
+    lib = gribapi.lib
+    if kind not in _KINDS:
+        raise ValueError(f"Unsupported product type {kind}")
+    names = []
+    ktypes = []
+    for key in keys:
+        name, sep, stype = key.partition(":")
+        if sep and stype not in _SUFFIX_TYPES:
+            raise ValueError(f"Unknown key type {stype!r}")
+        names.append(name.encode(gribapi.ENC))
+        ktypes.append(_SUFFIX_TYPES.get(stype))
+    columns = [[] for _ in keys]
+    reader = _KeyReader()
+    err = ffi.new("int *")
+    with open(path, "rb") as f:
+        while True:
+            if kind == eccodes.CODES_PRODUCT_GRIB:
+                h = lib.grib_new_from_file(ffi.NULL, f, 1, err)
+            else:
+                h = lib.codes_handle_new_from_file(ffi.NULL, f, kind, err)
+            if h == ffi.NULL:
+                if err[0] != lib.GRIB_END_OF_FILE:
+                    gribapi.GRIB_CHECK(err[0])
+                break
+            try:
+                for i, name in enumerate(names):
+                    if ktypes[i] is None:
+                        ktypes[i] = reader.native_type(h, name)
+                        if ktypes[i] is None:
+                            columns[i].append(None)
+                            continue
+                    columns[i].append(reader.get(h, name, ktypes[i]))
+            finally:
+                lib.grib_handle_delete(h)
+    return {
+        key: _column(values, ktype) for key, values, ktype in zip(keys, columns, ktypes)
+    }
+
+
+def _matches(value, wanted):
+    if isinstance(wanted, (list, tuple, set, frozenset)):
+        return value in wanted
+    return value == wanted
+
+
+class Index:
+    """Offsets, sizes and header values of the messages in a file
+
+    Use :func:`open_index` to get an index, loading it from its sidecar file
+    if it is up to date, and building (and saving) it otherwise.
+    """
+
+    def __init__(self, path, kind, keys, entries, mtime_ns, file_size):
+        self.path = os.fspath(path)
+        self.kind = kind
+        self.keys = tuple(keys)
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+        self.file_size = file_size
+
+    @classmethod
+    def build(cls, path, kind=eccodes.CODES_PRODUCT_GRIB, keys=None):
+        """Scan a file and index its messages"""
+        if kind not in _KINDS:
+            raise ValueError(f"Unsupported product type {kind}")
+        if keys is None:
+            keys = DEFAULT_KEYS[kind]
+        path = os.fspath(path)
+        keys = tuple(keys)
+        stat = os.stat(path)
+        columns = scan(path, ("offset:int", "totalLength:int") + keys, kind)
+        offsets = columns.pop("offset:int").tolist()
+        sizes = columns.pop("totalLength:int").tolist()
+        columns = {key: columns[key].tolist() for key in keys}
+        entries = [
+            IndexEntry(offset, size, {key: columns[key][i] for key in keys})
+            for i, (offset, size) in enumerate(zip(offsets, sizes))
+        ]
+        return cls(path, kind, keys, entries, stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def load(cls, index_path, path, kind=eccodes.CODES_PRODUCT_GRIB, keys=None):
+        """Load an index from a sidecar file
+
+        Returns ``None`` if the sidecar does not exist, is not an index, or is
+        out of date with respect to the file at ``path`` or to the requested
+        ``kind`` and ``keys``.
+        """
+        if keys is None:
+            keys = DEFAULT_KEYS[kind]
+        try:
+            with open(index_path, "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not _is_index(content) or content["version"] != _VERSION:
+            return None
+        stat = os.stat(path)
+        if (
+            content["kind"] != _KINDS.get(kind)
+            or content["mtime_ns"] != stat.st_mtime_ns
+            or content["size"] != stat.st_size
+            or not set(keys) <= set(content["keys"])
+        ):
+            return None
+        entries = [
+            IndexEntry(offset, size, dict(zip(content["keys"], values)))
+            for offset, size, *values in content["messages"]
+        ]
+        return cls(path, kind, content["keys"], entries, stat.st_mtime_ns, stat.st_size)
+
+    def save(self, index_path):
+        """Write the index to a sidecar file
+
+        The file is replaced atomically. An existing file that is not an index
+        is never overwritten: :class:`FileExistsError` is raised instead.
+        """
+        index_path = os.fspath(index_path)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r") as f:
+                    recognised = _is_index(json.load(f))
+            except (OSError, ValueError):
+                recognised = False
+            if not recognised:
+                raise FileExistsError(
+                    f"{index_path} exists and is not an index, not overwriting it"
+                )
+        content = {
+            "format": _FORMAT,
+            "version": _VERSION,
+            "kind": _KINDS[self.kind],
+            "mtime_ns": self.mtime_ns,
+            "size": self.file_size,
+            "keys": list(self.keys),
+            "messages": [
+                [entry.offset, entry.size] + [entry.header[key] for key in self.keys]
+                for entry in self.entries
+            ],
+        }
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(content, f, separators=(",", ":"))
+            os.replace(tmp_path, index_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @property
+    def offsets(self):
+        return [entry.offset for entry in self.entries]
+
+    @property
+    def sizes(self):
+        return [entry.size for entry in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def select(self, **query):
+        """Return the entries whose header values match ``query``
+
+        A value in ``query`` can be a list, tuple or set to match any of its
+        elements.
+        """
+        unknown = set(query) - set(self.keys)
+        if unknown:
+            raise KeyError(f"Keys not indexed: {', '.join(sorted(unknown))}")
+        return [
+            entry
+            for entry in self.entries
+            if all(_matches(entry.header[key], query[key]) for key in query)
+        ]
+
+
+def _is_index(content):
+    return isinstance(content, dict) and content.get("format") == _FORMAT
+
+
+def open_index(
+    path, kind=eccodes.CODES_PRODUCT_GRIB, keys=None, index_path=None, save=True
+):
+    """Get the index of a file, using its sidecar file when up to date
+
+    The sidecar file is ``path`` with the ``.idx`` suffix appended, unless
+    ``index_path`` is given. It is rebuilt if the file was modified, or if
+    ``keys`` are not all indexed. If ``save`` is true, a rebuilt index is
+    written back to the sidecar, unless it cannot be written or is not an
+    index.
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"Unsupported product type {kind}")
+    if keys is None:
+        keys = DEFAULT_KEYS[kind]
+    if index_path is None:
+        index_path = os.fspath(path) + INDEX_SUFFIX
+    index = Index.load(index_path, path, kind, keys)
+    if index is None:
+        index = Index.build(path, kind, keys)
+        if save:
+            try:
+                index.save(index_path)
+            except OSError:
+                pass
+    return index
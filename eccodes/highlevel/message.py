@@ -6,6 +6,8 @@ import numpy as np
 import eccodes
 
 from ._bufr import BUFRMessage  # noqa
+from .grid import get_grid as _get_grid
+from .grid import nearest_plan as _nearest_plan
 
 _TYPES_MAP = {
     "float": float,
@@ -14,6 +16,19 @@ _TYPES_MAP = {
 }
 
 
+def _float_type(dtype):
+    """Check a requested floating-point type, and return its scalar type"""
+    if dtype is None:
+        return None
+    dtype = np.dtype(dtype).type
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"Unsupported dtype {dtype.__name__}, use float32 or float64")
+    return dtype
+
+
+_MISSING_VALUES = (eccodes.CODES_MISSING_LONG, eccodes.CODES_MISSING_DOUBLE, "MISSING")
+
+
 @contextmanager
 def raise_keyerror(name):
     """Make operations on a key raise a KeyError if not found"""
@@ -71,12 +86,65 @@ class Message:
         except KeyError:
             return default
 
+    def get_many(self, keys, ktype_map=None):
+        """Get the values of several keys
+
+        The native type of the keys, and whether they are arrays, are looked
+        up in the cache of key types (see ``codes_get_key_type``), so that
+        getting a value usually costs a single call to ecCodes.
+
+        Parameters
+        ----------
+        keys: iterable of str
+            Names of the keys, which can be suffixed with ":str", ":int", or
+            ":float" to request a specific type.
+        ktype_map: dict, optional
+            Types requested for some keys. Overrides the suffixes in ``keys``
+
+        Returns
+        -------
+        dict
+            Value of each key, or ``None`` if the key is not found
+        """
+        ktype_map = ktype_map or {}
+        result = {}
+        for key in keys:
+            name, sep, stype = key.partition(":")
+            ktype = ktype_map.get(key)
+            if ktype is None and sep:
+                try:
+                    ktype = _TYPES_MAP[stype]
+                except KeyError:
+                    raise ValueError(f"Unknown key type {stype!r}")
+            try:
+                with raise_keyerror(name):
+                    native, is_array = eccodes.codes_get_key_type(self._handle, name)
+                    result[key] = self._get_resolved(name, ktype or native, is_array)
+            except KeyError:
+                result[key] = None
+        return result
+
+    def _get_resolved(self, name, ktype, is_array):
+        if not is_array:
+            try:
+                value = eccodes.codes_get(self._handle, name, ktype=ktype)
+            except eccodes.ArrayTooSmallError:
+                is_array = True
+        if is_array:
+            return eccodes.codes_get_array(self._handle, name, ktype=ktype)
+        if value in _MISSING_VALUES and eccodes.codes_is_missing(self._handle, name):
+            raise KeyError(name)
+        return value
+
     def set(self, *args, check_values: bool = True):
         """If two arguments are given, assumes this takes form of a single key
         value pair and sets the value of the given key. If a dictionary is passed in,
         then sets the values of all keys in the dictionary. Note, ordering
-        of the keys is important. Finally, by default, checks if values
-        have been set correctly
+        of the keys is important. Consecutive scalar keys are set in a single
+        call to ``codes_set_many``, which tries keys that are not found again
+        after the following ones, so such a key may be set after them. Finally,
+        by default, checks if values have been set correctly, reading them back
+        in a single pass
 
         Raises
         ------
@@ -97,35 +165,66 @@ class Message:
             of key and value pair, or a dictionary of key-value pairs"
             )
 
-        for name, value in key_values.items():
-            with raise_keyerror(name):
+        self._changing()
+        try:
+            # Consecutive scalar keys are set in a single call
+            scalars = {}
+            for name, value in key_values.items():
                 if np.ndim(value) > 0:
-                    eccodes.codes_set_array(self._handle, name, value)
+                    self._set_scalars(scalars)
+                    scalars = {}
+                    with raise_keyerror(name):
+                        eccodes.codes_set_array(self._handle, name, value)
                 else:
-                    eccodes.codes_set(self._handle, name, value)
+                    scalars[name] = value
+            self._set_scalars(scalars)
+        finally:
+            self._changed()
 
         if check_values:
-            # Check values just set
+            # Check values just set, reading them back in one pass
+            ktype_map = {
+                name: type(value)
+                for name, value in key_values.items()
+                if type(value) in _TYPES_MAP.values()
+            }
+            saved_values = self.get_many(key_values, ktype_map=ktype_map)
             for name, value in key_values.items():
-                if type(value) in _TYPES_MAP.values():
-                    saved_value = self.get(f"{name}:{type(value).__name__}")
-                else:
-                    saved_value = self.get(name)
+                saved_value = saved_values[name]
                 if not np.all(saved_value == value):
                     raise ValueError(
                         f"Unexpected retrieved value {saved_value} for key {name}. Expected {value}"
                     )
 
-    def get_array(self, name):
+    def _set_scalars(self, key_values):
+        if len(key_values) > 1:
+            try:
+                eccodes.codes_set_many(self._handle, key_values)
+            except eccodes.CodesInternalError as e:
+                with raise_keyerror(getattr(e, "key", None)):
+                    raise
+            return
+        for name, value in key_values.items():
+            with raise_keyerror(name):
+                eccodes.codes_set(self._handle, name, value)
+
+    def get_array(self, name, dtype=None):
         """Get the value of the given key as an array
 
+        Parameters
+        ----------
+        name: str
+            Name of the key
+        dtype: numpy.float32 or numpy.float64, optional
+            Floating-point type of the array, for keys such as ``values``
+
         Raises
         ------
         KeyError
             If the key is not set
         """
         with raise_keyerror(name):
-            return eccodes.codes_get_array(self._handle, name)
+            return eccodes.codes_get_array(self._handle, name, ktype=_float_type(dtype))
 
     def get_size(self, name):
         """Get the size of the given key
@@ -160,8 +259,10 @@ class Message:
         KeyError
             If the key does not exist
         """
+        self._changing()
         with raise_keyerror(name):
-            return eccodes.codes_set_array(self._handle, name, value)
+            eccodes.codes_set_array(self._handle, name, value)
+        self._changed()
 
     def set_missing(self, name):
         """Set the given key as missing
@@ -171,8 +272,16 @@ class Message:
         KeyError
             If the key does not exist
         """
+        self._changing()
         with raise_keyerror(name):
-            return eccodes.codes_set_missing(self._handle, name)
+            eccodes.codes_set_missing(self._handle, name)
+        self._changed()
+
+    def _changing(self):
+        """Called before keys are set"""
+
+    def _changed(self):
+        """Called when keys have been set, to drop state derived from them"""
 
     def __getitem__(self, name):
         return self._get(name)
@@ -235,30 +344,311 @@ class Message:
         eccodes.codes_dump(self._handle)
 
     def write_to(self, fileobj):
-        """Write the message to a file object"""
+        """Write the message to a file object
+
+        The encoded message is written without being copied. The file object
+        is not flushed, which is left to the caller.
+        """
         assert isinstance(fileobj, io.IOBase)
-        eccodes.codes_write(self._handle, fileobj)
+        eccodes.codes_write(self._handle, fileobj, flush=False)
+
+    def get_buffer(self, copy=True):
+        """Return a buffer containing the encoded message
 
-    def get_buffer(self):
-        """Return a buffer containing the encoded message"""
-        return eccodes.codes_get_message(self._handle)
+        With ``copy=False``, return a read-only memoryview of the message
+        buffer of the handle, without copying it. It must not be used once
+        the message is modified or deleted.
+        """
+        return eccodes.codes_get_message(self._handle, copy=copy)
+
+
+_DATA_KEYS = ("values", "codedValues")
 
 
 class GRIBMessage(Message):
-    def __init__(self, handle):
+    """A GRIB message
+
+    A message loaded with ``headers_only`` has no data section. If ``source``
+    is given as ``(path, offset, length)``, the message is lazy: its data
+    section is read from the file and decoded on first access to :attr:`data`,
+    :meth:`get_array` on the values or :meth:`get_data_points`, and can be
+    released with :meth:`release_data`. Its data section is also read to
+    encode it, with :meth:`get_buffer` or :meth:`write_to`, and before setting
+    keys, after which the message is no longer lazy.
+
+    ``dtype`` is the floating-point type of :attr:`data`, ``numpy.float64`` by
+    default, or ``numpy.float32``, in which case the values are decoded
+    directly in single precision.
+    """
+
+    def __init__(self, handle, headers_only=False, source=None, dtype=None):
         super().__init__(handle)
         self._data = None
+        self.headers_only = headers_only or source is not None
+        self._source = source
+        self._full = None
+        self._template = None
+        self.dtype = _float_type(dtype) or np.float64
+
+    def copy(self, headers_only=False):
+        """Create a copy of the current message
+
+        With ``headers_only``, the copy has no data section, which is neither
+        copied nor decoded. The copy of a lazy message is lazy too.
+        """
+        if self._source is not None:
+            if headers_only:
+                return self._data_message().copy(headers_only=True)
+            # The headers-only handle of a GRIB1 message cannot be cloned, as
+            # it lacks the end of the message: read it again instead
+            path, offset, _ = self._source
+            with open(path, "rb") as f:
+                f.seek(offset)
+                handle = eccodes.codes_grib_new_from_file(f, headers_only=True)
+            return self.__class__(handle, source=self._source, dtype=self.dtype)
+        headers_only = headers_only or self.headers_only
+        return self.__class__(
+            eccodes.codes_clone(self._handle, headers_only=headers_only),
+            headers_only=headers_only,
+            dtype=self.dtype,
+        )
+
+    def derive(self, values=None, **keys):
+        """Create a new message with the header of this one
+
+        The new message is cloned from a headers-only copy of this message,
+        which is cached, so that the data section of this message is never
+        decoded. ``keys`` are set first, then ``values``. For a lazy message,
+        the copy is made once from the message read from its file.
+
+        Parameters
+        ----------
+        values: array-like, optional
+            Values of the new message. If not given, the message has no data
+            section
+        **keys
+            Keys to set in the new message
+
+        Raises
+        ------
+        KeyError
+            If one of the keys does not exist
+        ValueError
+            If this is a GRIB1 message loaded headers only, and is not lazy
+        """
+        message = self.__class__(
+            eccodes.codes_clone(self._headers_template()._handle),
+            headers_only=values is None,
+            dtype=self.dtype,
+        )
+        if keys:
+            message.set(keys, check_values=False)
+        if values is not None:
+            message.set_array("values", values)
+        return message
+
+    def _headers_template(self):
+        """Return the cached headers-only copy used by :meth:`derive`"""
+        template = self._template
+        if template is None:
+            if self.headers_only and self._source is None and self["edition"] == 1:
+                # Its data section is needed to make a valid GRIB1 template
+                raise ValueError(
+                    "Message loaded headers only, load it lazily to derive from it"
+                )
+            loaded = self._full is not None
+            template = self._template = self.copy(headers_only=True)
+            if not loaded:
+                # Only the template is kept from the data section of a lazy message
+                self._full = None
+        return template
+
+    def _changing(self):
+        if self._source is not None:
+            # Keys are set in the complete message, which then replaces the
+            # headers-only handle, so that the message can still be encoded
+            full = self._data_message()
+            self._handle, full._handle = full._handle, self._handle
+            self._full = None
+            self._source = None
+            self.headers_only = False
+
+    def _changed(self):
+        self._data = None
+        self._template = None
+
+    def _data_message(self):
+        """Return the message holding the data section"""
+        if not self.headers_only:
+            return self
+        if self._source is None:
+            raise ValueError("Message loaded headers only, its data is not available")
+        if self._full is None:
+            path, offset, length = self._source
+            with open(path, "rb") as f:
+                f.seek(offset)
+                buf = bytearray(length)
+                buf = memoryview(buf)[: f.readinto(buf)]
+            self._full = GRIBMessage(eccodes.codes_new_from_message(buf, copy=False))
+        return self._full
+
+    def _is_lazy_data(self, name):
+        return self._source is not None and name.partition(":")[0] in _DATA_KEYS
+
+    def _get(self, name, ktype=None):
+        if self._is_lazy_data(name):
+            return self._data_message()._get(name, ktype=ktype)
+        return super()._get(name, ktype=ktype)
+
+    def get_array(self, name, dtype=None):
+        """Get the value of the given key as an array
+
+        Parameters
+        ----------
+        name: str
+            Name of the key
+        dtype: numpy.float32 or numpy.float64, optional
+            Floating-point type of the array, for keys such as ``values``. By
+            default, the type of the message (see ``dtype``) for ``values``
+            and ``codedValues``
+
+        Raises
+        ------
+        KeyError
+            If the key is not set
+        """
+        if dtype is None and name in _DATA_KEYS:
+            dtype = self.dtype
+        if self._is_lazy_data(name):
+            return self._data_message().get_array(name, dtype=dtype)
+        return super().get_array(name, dtype=dtype)
+
+    def get_many(self, keys, ktype_map=None):
+        keys = list(keys)
+        result = super().get_many(keys, ktype_map=ktype_map)
+        for key in keys:
+            # Not in the headers only handle of a lazy message
+            if self._is_lazy_data(key):
+                result[key] = self.get(key, ktype=(ktype_map or {}).get(key))
+        return result
+
+    get_many.__doc__ = Message.get_many.__doc__
 
     @property
     def data(self):
-        """Return the array of values"""
+        """Return the array of values
+
+        Raises
+        ------
+        ValueError
+            If the message was loaded headers only, and is not lazy
+        """
         if self._data is None:
-            self._data = self._get("values")
+            self._data = self._data_message()._get("values", ktype=self.dtype)
         return self._data
 
+    @property
+    def grid(self):
+        """Return the :class:`Grid` of the message
+
+        Grids are cached by hash of the grid section, and shared by all the
+        messages on the same grid.
+        """
+        return _get_grid(self)
+
+    @property
+    def latitudes(self):
+        """Return the read-only array of latitudes of the grid points"""
+        return self.grid.latitudes
+
+    @property
+    def longitudes(self):
+        """Return the read-only array of longitudes of the grid points"""
+        return self.grid.longitudes
+
+    def write_to(self, fileobj):
+        Message.write_to(self._encoded_message(), fileobj)
+
+    write_to.__doc__ = Message.write_to.__doc__
+
+    def get_buffer(self, copy=True):
+        return Message.get_buffer(self._encoded_message(), copy=copy)
+
+    get_buffer.__doc__ = Message.get_buffer.__doc__
+
+    def _encoded_message(self):
+        """Return the message holding the complete encoded message"""
+        # The handle of a message loaded headers only does not hold the data
+        # section, which was skipped in the file
+        if self.headers_only and self._source is None:
+            raise ValueError("Message loaded headers only, it cannot be encoded")
+        return self._data_message()
+
+    def release_data(self):
+        """Release the decoded values, and the data section of a lazy message"""
+        self._data = None
+        self._full = None
+
+    def read_values_into(self, out):
+        """Decode the values directly into an existing array
+
+        ``out`` must be a C-contiguous array of float32 or float64 with one
+        element per value, for instance a row of a larger array. The values
+        are not cached in :attr:`data`.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``out``
+        """
+        return eccodes.codes_get_array(self._data_message()._handle, "values", out=out)
+
     def get_data_points(self):
         """Get the list of ``(lat, lon, value)`` data points"""
-        return eccodes.codes_grib_get_data(self._handle)
+        return eccodes.codes_grib_get_data(self._data_message()._handle)
+
+    def get_data_arrays(self):
+        """Get the ``(lats, lons, values)`` arrays of the data points"""
+        return eccodes.codes_grib_get_data_arrays(self._data_message()._handle)
+
+    def nearest(self, lats, lons, npoints=1, is_lsm=False):
+        """Find the nearest grid points to the given points
+
+        Parameters
+        ----------
+        lats, lons: array-like
+            Coordinates of the points
+        npoints: int
+            Number of nearest grid points to find, 1 or 4
+        is_lsm: bool
+            Whether to find the nearest land point. Only supported with 1 point
+
+        Returns
+        -------
+        Bunch
+            Arrays ``lat``, ``lon``, ``value``, ``distance`` and ``index`` of
+            the nearest grid points, of shape ``(n,)`` if ``npoints`` is 1, or
+            ``(n, 4)`` if it is 4
+        """
+        return eccodes.codes_grib_find_nearest_arrays(
+            self._data_message()._handle, lats, lons, is_lsm=is_lsm, npoints=npoints
+        )
+
+    def nearest_plan(self, lats, lons, npoints=1):
+        """Get a reusable plan of the nearest grid points to the given points
+
+        Plans are cached by grid and points, so that the nearest grid points
+        are only searched once for all the messages on the same grid. See
+        :class:`NearestPlan`.
+
+        Parameters
+        ----------
+        lats, lons: array-like
+            Coordinates of the points
+        npoints: int
+            Number of nearest grid points to find, 1 or 4
+        """
+        return _nearest_plan(self, lats, lons, npoints=npoints)
 
     @classmethod
     def from_samples(cls, name):
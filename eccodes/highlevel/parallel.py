@@ -0,0 +1,233 @@
+import collections
+import concurrent.futures
+import itertools
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import eccodes
+
+from .reader import _MSG_CLASSES, _check_thread_support
+
+_SharedArray = collections.namedtuple("_SharedArray", ["name", "shape", "dtype"])
+
+
+def _share(array):
+    """Copy an array to a new shared memory block (worker side)"""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, array.dtype, buffer=shm.buf)
+    shared[...] = array
+    del shared
+    shm.close()
+    return _SharedArray(shm.name, array.shape, array.dtype.str)
+
+
+def _unshare(shared):
+    """Get back an array from a shared memory block, and free the block"""
+    shm = shared_memory.SharedMemory(name=shared.name)
+    try:
+        view = np.ndarray(shared.shape, shared.dtype, buffer=shm.buf)
+        array = view.copy()
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+    return array
+
+
+def _decode_messages(path, ranges, kind, keys):
+    """Decode the messages at the given ``(offset, size)`` ranges of a file"""
+    start = ranges[0][0]
+    end = ranges[-1][0] + ranges[-1][1]
+    with open(path, "rb") as f:
+        f.seek(start)
+        buf = bytearray(end - start)
+        view = memoryview(buf)[: f.readinto(buf)]
+    results = []
+    for offset, size in ranges:
+        offset -= start
+        handle = eccodes.codes_new_from_message(
+            view[offset : offset + size], copy=False
+        )
+        message = _MSG_CLASSES[kind](handle)
+        result = {}
+        for key in keys:
+            value = message.get(key)
+            if type(value) is np.ndarray:
+                value = _share(value)
+            result[key] = value
+        results.append(result)
+        del message
+    return results
+
+
+def _receive(results):
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, _SharedArray):
+                result[key] = _unshare(value)
+    return results
+
+
+class ParallelReader:
+    """Decode messages from several files on a pool of worker processes
+
+    Message boundaries are located with ``codes_extract_offsets_sizes`` and
+    batches of ``batch_size`` consecutive messages are decoded by the workers.
+    For each message a ``dict`` is yielded with the values of ``keys``; array
+    values, such as ``"values"``, are passed back through shared memory.
+
+    If ``ordered`` is true, messages are yielded in file order, otherwise as
+    soon as they are decoded. At most ``max_pending`` batches (by default,
+    twice the number of workers) are in flight at any time, which bounds memory
+    usage when the consumer is slower than the workers.
+    """
+
+    def __init__(
+        self,
+        paths,
+        kind=eccodes.CODES_PRODUCT_GRIB,
+        keys=("values",),
+        workers=None,
+        ordered=True,
+        batch_size=16,
+        max_pending=None,
+    ):
+        if kind not in _MSG_CLASSES:
+            raise ValueError(f"Unsupported product type {kind}")
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        self._paths = [os.fspath(path) for path in paths]
+        self._kind = kind
+        self._keys = tuple(keys)
+        self._workers = workers or os.cpu_count() or 1
+        self._ordered = ordered
+        self._batch_size = batch_size
+        self._max_pending = max_pending or 2 * self._workers
+        self._results = self._iterate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop decoding and release the workers"""
+        self._results.close()
+
+    def _batches(self):
+        for path in self._paths:
+            if os.stat(path).st_size == 0:
+                continue
+            ranges = list(eccodes.codes_extract_offsets_sizes(path, self._kind))
+            for i in range(0, len(ranges), self._batch_size):
+                yield path, ranges[i : i + self._batch_size]
+
+    def _iterate(self):
+        # Make the workers share the tracker of the parent for shared memory
+        resource_tracker.ensure_running()
+        executor = concurrent.futures.ProcessPoolExecutor(self._workers)
+        batches = self._batches()
+        pending = collections.deque()
+        try:
+            while True:
+                for path, ranges in batches:
+                    pending.append(
+                        executor.submit(
+                            _decode_messages, path, ranges, self._kind, self._keys
+                        )
+                    )
+                    if len(pending) >= self._max_pending:
+                        break
+                if not pending:
+                    return
+                if self._ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    future = done.pop()
+                    pending.remove(future)
+                yield from _receive(future.result())
+        finally:
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                if not future.cancelled():
+                    try:
+                        _receive(future.result())
+                    except Exception:
+                        pass
+            executor.shutdown()
+
+
+def _encode(template, keys, values):
+    return template.derive(values, **(keys or {})).get_buffer()
+
+
+def _encode_items(arrays, key_overrides):
+    if key_overrides is None or isinstance(key_overrides, dict):
+        yield from zip(arrays, itertools.repeat(key_overrides))
+        return
+    missing = object()
+    for values, keys in itertools.zip_longest(arrays, key_overrides, fillvalue=missing):
+        if values is missing or keys is missing:
+            raise ValueError("arrays and key_overrides have different lengths")
+        yield values, keys
+
+
+def encode_many(template, arrays, key_overrides=None, workers=None):
+    """Encode arrays of values as GRIB messages on a pool of threads
+
+    Each message is created with :meth:`GRIBMessage.derive`, so that the data
+    section of ``template`` is never copied. The GIL is released during the calls to
+    ecCodes, so that the values are packed in parallel.
+
+    Parameters
+    ----------
+    template: GRIBMessage
+        Message whose header is used for all the encoded messages
+    arrays: iterable of array-like
+        Values of each message
+    key_overrides: dict or iterable of dict, optional
+        Keys set before the values, either in all the messages, or for each
+        array
+    workers: int, optional
+        Number of threads, by default the number of CPUs
+
+    Returns
+    -------
+    list of bytes
+        Encoded messages, in the order of ``arrays``
+
+    Raises
+    ------
+    ValueError
+        If ``arrays`` and ``key_overrides`` have different lengths
+    """
+    _check_thread_support()
+    workers = workers or os.cpu_count() or 1
+    results = []
+    pending = collections.deque()
+    executor = concurrent.futures.ThreadPoolExecutor(workers)
+    # Create the cached template before the workers share it
+    template._headers_template()
+    try:
+        for values, keys in _encode_items(arrays, key_overrides):
+            pending.append(executor.submit(_encode, template, keys, values))
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return results
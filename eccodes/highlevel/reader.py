@@ -1,3 +1,12 @@
+import asyncio
+import collections
+import concurrent.futures
+import mmap
+import operator
+import os
+
+import numpy as np
+
 import eccodes
 import gribapi
 from gribapi import ffi
@@ -10,14 +19,155 @@ _MSG_CLASSES = {
 }
 
 
+_MAGICS = {
+    eccodes.CODES_PRODUCT_GRIB: b"GRIB",
+    eccodes.CODES_PRODUCT_BUFR: b"BUFR",
+}
+
+_END_MARKER = b"7777"
+
+_READ_AHEAD_SIZE = 1 << 20
+
+
+def _int(buf, start, size):
+    return int.from_bytes(buf[start : start + size], "big")
+
+
+def _grib1_large_length(buf, start, length):
+    # Large GRIB1 messages flag the length in section 0, which is then in
+    # units of 120 bytes, corrected using the length of section 4
+    pos = start + 8
+    if len(buf) < pos + 8:
+        return None
+    flags = buf[pos + 7]
+    pos += _int(buf, pos, 3)
+    for present in (flags & 0x80, flags & 0x40):  # sections 2 and 3
+        if present:
+            if len(buf) < pos + 3:
+                return None
+            pos += _int(buf, pos, 3)
+    if len(buf) < pos + 3:
+        return None
+    sec4_length = _int(buf, pos, 3)
+    if sec4_length < 120:
+        length = (length & 0x7FFFFF) * 120 - sec4_length + 4
+    return length
+
+
+def _message_length(buf, start):
+    """Get the total length of the message starting at ``start`` in ``buf``
+
+    The length is read from section 0. Returns ``None`` if ``buf`` does not
+    contain enough bytes to determine it, and 0 if there is no valid message
+    header at ``start``.
+    """
+    if len(buf) < start + 16:
+        return None
+    magic = bytes(buf[start : start + 4])
+    edition = buf[start + 7]
+    if magic == b"GRIB":
+        if edition == 1:
+            length = _int(buf, start + 4, 3)
+            if length & 0x800000:
+                return _grib1_large_length(buf, start, length)
+            return length
+        if edition in (2, 3):
+            return _int(buf, start + 8, 8)
+    elif magic == b"BUFR":
+        if edition in (2, 3, 4):
+            return _int(buf, start + 4, 3)
+    return 0
+
+
+def _find(view, magic, start, chunk_size=1 << 16):
+    """Find the next occurrence of ``magic`` in a memoryview"""
+    size = len(magic)
+    if view[start : start + size] == magic:
+        return start
+    while start < len(view):
+        chunk = bytes(view[start : start + chunk_size + size - 1])
+        pos = chunk.find(magic)
+        if pos >= 0:
+            return start + pos
+        start += chunk_size
+    return -1
+
+
+def _scan_messages(view, kind):
+    """Yield the ``(offset, size)`` of each message found in a memoryview"""
+    magic = _MAGICS[kind]
+    offset = 0
+    while True:
+        offset = _find(view, magic, offset)
+        if offset < 0:
+            return
+        length = _message_length(view, offset)
+        if length is None:
+            return
+        end = offset + length
+        if length > 16 and view[end - 4 : end] == _END_MARKER:
+            yield offset, length
+            offset = end
+        else:
+            offset += 1
+
+
+class _MessageFramer:
+    """Split a byte stream, fed in chunks, into complete messages"""
+
+    def __init__(self, kind):
+        self._magic = _MAGICS[kind]
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+
+    def next_message(self, eof=False):
+        """Return the next complete message, or ``None`` if more data is needed
+
+        Once ``eof`` is set, no more data is expected and incomplete messages
+        are discarded.
+        """
+        buf = self._buffer
+        while True:
+            start = buf.find(self._magic)
+            if start < 0:
+                # Keep what could be the beginning of a split magic string
+                del buf[: max(0, len(buf) - len(self._magic) + 1)]
+                return None
+            del buf[:start]
+            length = _message_length(buf, 0)
+            if length is None and not eof:
+                return None
+            if length and length > 16:
+                if len(buf) < length and not eof:
+                    return None
+                if buf[length - 4 : length] == _END_MARKER:
+                    message = buf[:length]
+                    del buf[:length]
+                    return message
+            # Not a valid message: look for the next one
+            del buf[:1]
+
+
+def _message_options(kind, dtype):
+    """Return the options to create messages with, for a given ``dtype``"""
+    if dtype is None:
+        return {}
+    if kind != eccodes.CODES_PRODUCT_GRIB:
+        raise ValueError("dtype is only supported for GRIB")
+    return {"dtype": dtype}
+
+
 class ReaderBase:
-    def __init__(self, kind=eccodes.CODES_PRODUCT_GRIB):
+    def __init__(self, kind=eccodes.CODES_PRODUCT_GRIB, dtype=None):
         self._peeked = None
         self._kind = kind
         cls = _MSG_CLASSES.get(kind)
         if cls is None:
             raise ValueError(f"Unsupported product type {kind}")
         self._msg_class = cls
+        self._msg_options = _message_options(kind, dtype)
 
     def __iter__(self):
         return self
@@ -30,11 +180,14 @@ class ReaderBase:
         handle = self._next_handle()
         if handle is None:
             raise StopIteration
-        return self._msg_class(handle)
+        return self._make_message(handle)
 
     def _next_handle(self):
         raise NotImplementedError
 
+    def _make_message(self, handle):
+        return self._msg_class(handle, **self._msg_options)
+
     def __enter__(self):
         return self
 
@@ -46,19 +199,53 @@ class ReaderBase:
         if self._peeked is None:
             handle = self._next_handle()
             if handle is not None:
-                self._peeked = self._msg_class(handle)
+                self._peeked = self._make_message(handle)
         return self._peeked
 
 
 class FileReader(ReaderBase):
-    """Read messages from a file"""
-
-    def __init__(self, path, kind=eccodes.CODES_PRODUCT_GRIB):
-        super().__init__(kind=kind)
+    """Read messages from a file
+
+    If ``headers_only`` is true, GRIB messages are loaded without their data
+    section, which is much faster when only the header keys are needed. If
+    ``lazy`` is true, they are also loaded headers only, but their data section
+    is read back from the file when needed (see :class:`GRIBMessage`).
+
+    ``dtype`` sets the floating-point type of the data of GRIB messages,
+    ``numpy.float64`` by default, or ``numpy.float32``.
+    """
+
+    def __init__(
+        self,
+        path,
+        kind=eccodes.CODES_PRODUCT_GRIB,
+        headers_only=False,
+        lazy=False,
+        dtype=None,
+    ):
+        super().__init__(kind=kind, dtype=dtype)
+        if (headers_only or lazy) and kind != eccodes.CODES_PRODUCT_GRIB:
+            raise ValueError("headers_only and lazy are only supported for GRIB")
+        self._headers_only = headers_only or lazy
+        self._path = os.fspath(path) if lazy else None
         self.file = open(path, "rb")
 
     def _next_handle(self):
-        return eccodes.codes_new_from_file(self.file, self._kind)
+        return eccodes.codes_new_from_file(
+            self.file, self._kind, headers_only=self._headers_only
+        )
+
+    def _make_message(self, handle):
+        if self._path is not None:
+            source = (
+                self._path,
+                eccodes.codes_get(handle, "offset", ktype=int),
+                eccodes.codes_get(handle, "totalLength"),
+            )
+            return self._msg_class(handle, source=source, **self._msg_options)
+        if self._headers_only:
+            return self._msg_class(handle, headers_only=True, **self._msg_options)
+        return super()._make_message(handle)
 
     def __enter__(self):
         self.file.__enter__()
@@ -67,29 +254,166 @@ class FileReader(ReaderBase):
     def __exit__(self, exc_type, exc_value, traceback):
         return self.file.__exit__(exc_type, exc_value, traceback)
 
+    @staticmethod
+    def open_indexed(path, kind=eccodes.CODES_PRODUCT_GRIB, sidecar=False, dtype=None):
+        """Open a file for random access to its messages
 
-class MemoryReader(ReaderBase):
-    """Read messages from memory"""
+        See :class:`IndexedFileReader`.
+        """
+        return IndexedFileReader(path, kind=kind, sidecar=sidecar, dtype=dtype)
+
+
+class IndexedFileReader:
+    """Random access to the messages of a file
+
+    Supports ``len()``, indexing with an integer, a slice, or a sequence of
+    integers. Slices and sequences return lists of messages. Only the requested
+    messages are read from the file, using the message boundaries located with
+    ``codes_extract_offsets_sizes``, or loaded from the sidecar index of the
+    file if ``sidecar`` is true (see :func:`open_index`).
+    """
+
+    def __init__(
+        self, path, kind=eccodes.CODES_PRODUCT_GRIB, sidecar=False, dtype=None
+    ):
+        cls = _MSG_CLASSES.get(kind)
+        if cls is None:
+            raise ValueError(f"Unsupported product type {kind}")
+        self._msg_class = cls
+        self._msg_options = _message_options(kind, dtype)
+        self.file = open(path, "rb")
+        if sidecar:
+            from .index import open_index
+
+            index = open_index(path, kind, keys=())
+            self._ranges = [(entry.offset, entry.size) for entry in index]
+        elif os.fstat(self.file.fileno()).st_size == 0:
+            self._ranges = []
+        else:
+            self._ranges = list(
+                eccodes.codes_extract_offsets_sizes(os.fspath(path), kind)
+            )
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(i) for i in range(*index.indices(len(self)))]
+        try:
+            i = operator.index(index)
+        except TypeError:
+            mask = np.asarray(index)
+            if mask.dtype == bool:
+                if mask.shape != (len(self),):
+                    raise IndexError(
+                        f"Boolean index of shape {mask.shape} for {len(self)} messages"
+                    )
+                index = np.flatnonzero(mask)
+            return [self._read(operator.index(i)) for i in index]
+        return self._read(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._read(i)
+
+    def _read(self, i):
+        offset, size = self._ranges[i]
+        self.file.seek(offset)
+        message = bytearray(size)
+        message = memoryview(message)[: self.file.readinto(message)]
+        return self._msg_class(
+            eccodes.codes_new_from_message(message, copy=False), **self._msg_options
+        )
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MappedFileReader(ReaderBase):
+    """Read messages from a memory-mapped file
+
+    The file is mapped once and the message boundaries are located with
+    ``codes_extract_offsets_sizes``. Each handle is then created over its slice
+    of the mapping, without copying the message, so that processes reading the
+    same file share its pages through the page cache.
+    """
 
-    def __init__(self, buf, kind=eccodes.CODES_PRODUCT_GRIB):
-        super().__init__(kind=kind)
+    def __init__(self, path, kind=eccodes.CODES_PRODUCT_GRIB, dtype=None):
+        super().__init__(kind=kind, dtype=dtype)
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self._mmap = None
+            self._view = memoryview(b"")
+            self._offsets = iter(())
+            return
+        # Copy-on-write, so that setting keys does not modify the file
+        self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        self._view = memoryview(self._mmap)
+        self._offsets = eccodes.codes_extract_offsets_sizes(os.fspath(path), kind)
+
+    def _next_handle(self):
+        try:
+            offset, size = next(self._offsets)
+        except StopIteration:
+            return None
+        return eccodes.codes_new_from_message(
+            self._view[offset : offset + size], copy=False
+        )
+
+    def close(self):
+        """Close the file
+
+        The mapping itself is released once all the messages read from it
+        have been released.
+        """
+        self.file.close()
+        if self._mmap is not None:
+            try:
+                self._view.release()
+                self._mmap.close()
+            except BufferError:
+                pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MemoryReader(ReaderBase):
+    """Read messages from memory
+
+    The message boundaries are found by scanning ``buf`` once, and each message
+    is handed to ecCodes as an exact-length slice. By default every message is
+    copied into its own handle. With ``copy=False``, the handles are created
+    directly over ``buf``, which is kept alive as long as they exist; such
+    messages should then be treated as read-only, as setting keys may write
+    into ``buf``. Read-only buffers, such as ``bytes``, are always copied.
+    """
+
+    def __init__(self, buf, kind=eccodes.CODES_PRODUCT_GRIB, copy=True, dtype=None):
+        super().__init__(kind=kind, dtype=dtype)
         self.buf = buf
-        self._index = 0
+        self._copy = copy
+        self._view = memoryview(buf).cast("B")
+        self._messages = _scan_messages(self._view, kind)
 
     def _next_handle(self):
         if self.buf is None:
             return None
-        handle = eccodes.codes_new_from_message(self.buf[self._index :])
-
         try:
-            handle_length = eccodes.codes_get(handle, "totalLength")
-        except eccodes.GribInternalError:
-            return None
-
-        self._index += handle_length
-        if self._index >= len(self.buf):
+            offset, size = next(self._messages)
+        except StopIteration:
             self.buf = None
-        return handle
+            return None
+        return eccodes.codes_new_from_message(
+            self._view[offset : offset + size], copy=self._copy
+        )
 
 
 try:
@@ -136,26 +460,188 @@ def codes_new_from_stream(stream):
             gribapi.GRIB_CHECK(err)
         return None
 
-    # TODO: remove the extra copy?
-    handle = gribapi.lib.grib_handle_new_from_message_copy(ffi.NULL, buf, length[0])
+    # The handle takes over buf, which is freed when the handle is released
+    handle = gribapi.lib.grib_handle_new_from_message(ffi.NULL, buf, length[0])
     if handle == ffi.NULL:
         return None
     else:
-        return gribapi.put_handle(handle)
+        return gribapi.put_handle(handle, buffer=buf)
 
 
 class StreamReader(ReaderBase):
-    """Read messages from a stream (an object with a ``read`` method)"""
-
-    def __init__(self, stream, kind=eccodes.CODES_PRODUCT_GRIB):
-        if cstd is None:
-            raise OSError("This feature is not supported on Windows")
-        if pyread_callback is None:
-            raise OSError(
-                "This feature cannot be used because the OS prevents allocating write+execute memory"
-            )
-        super().__init__(kind=kind)
+    """Read messages from a stream (an object with a ``read`` method)
+
+    By default ecCodes reads from the stream through a callback. With
+    ``buffered=True``, messages are instead framed in Python over read-ahead
+    chunks of up to ``buffer_size`` bytes, and only complete messages are
+    passed to ecCodes. This saves a Python callback for every small read, and
+    also works where callbacks are not available (Windows, or when the OS
+    prevents allocating write+execute memory).
+    """
+
+    def __init__(
+        self,
+        stream,
+        kind=eccodes.CODES_PRODUCT_GRIB,
+        buffered=False,
+        buffer_size=_READ_AHEAD_SIZE,
+        dtype=None,
+    ):
+        if not buffered:
+            if cstd is None:
+                raise OSError("This feature is not supported on Windows")
+            if pyread_callback is None:
+                raise OSError(
+                    "This feature cannot be used because the OS prevents allocating write+execute memory"
+                )
+        super().__init__(kind=kind, dtype=dtype)
         self.stream = stream
+        if buffered:
+            self._framer = _MessageFramer(kind)
+            self._read = getattr(stream, "read1", stream.read)
+            self._buffer_size = buffer_size
+        else:
+            self._framer = None
 
     def _next_handle(self):
-        return codes_new_from_stream(self.stream)
+        if self._framer is None:
+            return codes_new_from_stream(self.stream)
+        eof = False
+        while True:
+            message = self._framer.next_message(eof=eof)
+            if message is not None:
+                return eccodes.codes_new_from_message(message, copy=False)
+            if eof:
+                return None
+            data = self._read(self._buffer_size)
+            if data:
+                self._framer.feed(data)
+            else:
+                eof = True
+
+
+def _check_thread_support():
+    if eccodes.codes_get_api_version(int) < 23800:
+        return  # features cannot be queried
+    features = eccodes.codes_get_features(eccodes.CODES_FEATURES_ENABLED).split()
+    if "ECCODES_THREADS" not in features and "ECCODES_OMP_THREADS" not in features:
+        raise RuntimeError(
+            "Using several threads requires ecCodes to be built with thread support"
+        )
+
+
+def _decode(message):
+    if isinstance(message, GRIBMessage):
+        # Lazy messages read their data section from the file on the thread
+        if not message.headers_only or message._source is not None:
+            message.data
+    else:
+        message.unpack()
+    return message
+
+
+class ThreadPoolReader:
+    """Decode the messages of a reader on a pool of threads
+
+    Messages are read from ``reader`` in the calling thread, while the values
+    of up to ``prefetch`` messages ahead are decoded by ``workers`` threads.
+    The GIL is released during the calls to ecCodes, so that decoding runs in
+    parallel without having to pass messages between processes. Messages are
+    returned in the order of ``reader``.
+    """
+
+    def __init__(self, reader, workers=None, prefetch=None):
+        _check_thread_support()
+        self.reader = reader
+        workers = workers or os.cpu_count() or 1
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self._prefetch = prefetch or 2 * workers
+        self._pending = collections.deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while len(self._pending) < self._prefetch:
+            message = next(self.reader, None)
+            if message is None:
+                break
+            self._pending.append(self._executor.submit(_decode, message))
+        if not self._pending:
+            raise StopIteration
+        return self._pending.popleft().result()
+
+    def close(self):
+        """Stop decoding and release the threads"""
+        self._executor.shutdown(cancel_futures=True)
+        self._pending.clear()
+
+    def __enter__(self):
+        self.reader.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self.reader.__exit__(exc_type, exc_value, traceback)
+
+
+class AsyncStreamReader:
+    """Read messages asynchronously from a stream
+
+    ``stream`` can be an :class:`asyncio.StreamReader` (or any object with a
+    ``read`` coroutine method), or an async iterable of byte chunks. Messages
+    are framed in Python, then decoded in ``executor`` (by default, the default
+    executor of the event loop). Iterate with ``async for``.
+    """
+
+    def __init__(
+        self,
+        stream,
+        kind=eccodes.CODES_PRODUCT_GRIB,
+        executor=None,
+        buffer_size=_READ_AHEAD_SIZE,
+    ):
+        cls = _MSG_CLASSES.get(kind)
+        if cls is None:
+            raise ValueError(f"Unsupported product type {kind}")
+        _check_thread_support()
+        self._msg_class = cls
+        self.stream = stream
+        if hasattr(stream, "read"):
+            self._chunks = None
+        else:
+            self._chunks = stream.__aiter__()
+        self._framer = _MessageFramer(kind)
+        self._executor = executor
+        self._buffer_size = buffer_size
+        self._eof = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            message = self._framer.next_message(eof=self._eof)
+            if message is not None:
+                break
+            if self._eof:
+                raise StopAsyncIteration
+            data = await self._read()
+            if data:
+                self._framer.feed(data)
+            else:
+                self._eof = True
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._decode, message)
+
+    async def _read(self):
+        if self._chunks is None:
+            return await self.stream.read(self._buffer_size)
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+    def _decode(self, message):
+        handle = eccodes.codes_new_from_message(message, copy=False)
+        return _decode(self._msg_class(handle))
@@ -0,0 +1,226 @@
+import os
+
+import numpy as np
+
+import eccodes
+
+from .index import _KINDS, DEFAULT_KEYS, INDEX_SUFFIX, Index, IndexEntry
+
+
+def _iov_max():
+    try:
+        value = os.sysconf("SC_IOV_MAX")
+    except (AttributeError, ValueError, OSError):
+        value = -1
+    return value if value > 0 else 1024
+
+
+_IOV_MAX = _iov_max()
+
+
+def _write_all(fd, views):
+    """Write buffers to a file descriptor, with as few system calls as possible"""
+    if not hasattr(os, "writev"):
+        data = b"".join(views)
+        while data:
+            data = data[os.write(fd, data) :]
+        return
+    views = list(views)
+    while views:
+        batch = views[:_IOV_MAX]
+        written = os.writev(fd, batch)
+        # writev may write less than requested: skip the buffers written
+        # entirely, and resume from the middle of a partially written one
+        i = 0
+        while i < len(batch) and written >= len(batch[i]):
+            written -= len(batch[i])
+            i += 1
+        views = views[i:]
+        if written:
+            views[0] = memoryview(views[0])[written:]
+
+
+def _header(message, keys):
+    if hasattr(message, "get_many"):
+        return message.get_many(keys)
+    header = {}
+    for key in keys:
+        try:
+            value = message[key]
+        except (KeyError, eccodes.KeyValueNotFoundError):
+            value = None
+        if isinstance(value, np.generic):
+            value = value.item()
+        header[key] = value
+    return header
+
+
+class FileWriter:
+    """Write messages to a file, in batches
+
+    Encoded messages are buffered until their size reaches ``buffer_size``,
+    and then written with a single system call.
+
+    The offset and size of each message are recorded, along with the values of
+    ``index_keys``, so that the index of the file (see :class:`Index`) can be
+    saved without scanning it again.
+
+    Parameters
+    ----------
+    path: str or path-like
+        Path of the file to write, which is truncated if it exists
+    kind: int
+        Product type (``eccodes.CODES_PRODUCT_GRIB`` or
+        ``eccodes.CODES_PRODUCT_BUFR``)
+    buffer_size: int
+        Size in bytes from which buffered messages are written to the file. If
+        0, each message is written immediately
+    fsync: bool
+        If true, synchronise the file to disk after each batch is written
+    index_keys: iterable of str, optional
+        Header keys recorded for the index, by default the keys indexed by
+        :func:`open_index`
+    copy: bool
+        If false, buffer views of the encoded messages instead of copies. The
+        messages must then not be modified, nor their data released, until
+        the writer is flushed
+    """
+
+    def __init__(
+        self,
+        path,
+        kind=eccodes.CODES_PRODUCT_GRIB,
+        buffer_size=1 << 20,
+        fsync=False,
+        index_keys=None,
+        copy=True,
+    ):
+        if kind not in _KINDS:
+            raise ValueError(f"Unsupported product type {kind}")
+        if index_keys is None:
+            index_keys = DEFAULT_KEYS[kind]
+        self.path = os.fspath(path)
+        self.kind = kind
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.index_keys = tuple(index_keys)
+        self.copy = copy
+        self.entries = []
+        self._pending = []
+        self._pending_size = 0
+        self._offset = 0
+        self._fd = os.open(
+            self.path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+            0o666,
+        )
+
+    def write(self, message):
+        """Write a message
+
+        Returns
+        -------
+        int
+            Offset of the message in the file
+        """
+        if self._fd is None:
+            raise ValueError("I/O operation on closed writer")
+        if self.copy:
+            view = message.get_buffer()
+            owner = None
+        else:
+            view = message.get_buffer(copy=False)
+            # Keep a reference to the message, which owns the buffer
+            owner = message
+        size = len(view)
+        header = _header(message, self.index_keys) if self.index_keys else {}
+        offset = self._offset
+        self.entries.append(IndexEntry(offset, size, header))
+        self._pending.append((owner, view))
+        self._pending_size += size
+        self._offset += size
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+        return offset
+
+    def write_many(self, messages):
+        """Write several messages
+
+        Returns
+        -------
+        int
+            Number of messages written
+        """
+        count = 0
+        for message in messages:
+            self.write(message)
+            count += 1
+        return count
+
+    def flush(self):
+        """Write the buffered messages to the file"""
+        if self._pending:
+            _write_all(self._fd, [view for _, view in self._pending])
+            self._pending.clear()
+            self._pending_size = 0
+            if self.fsync:
+                os.fsync(self._fd)
+
+    def index(self):
+        """Get the index of the messages written so far
+
+        The buffered messages are written first.
+        """
+        if self._fd is not None:
+            self.flush()
+        stat = os.stat(self.path)
+        return Index(
+            self.path,
+            self.kind,
+            self.index_keys,
+            list(self.entries),
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+
+    def save_index(self, index_path=None):
+        """Save the index of the messages written so far to a sidecar file
+
+        The sidecar file is the path of the file with the ``.idx`` suffix
+        appended, unless ``index_path`` is given. See :meth:`Index.save`.
+
+        Returns
+        -------
+        Index
+        """
+        if index_path is None:
+            index_path = self.path + INDEX_SUFFIX
+        index = self.index()
+        index.save(index_path)
+        return index
+
+    def close(self):
+        """Write the buffered messages and close the file"""
+        if self._fd is None:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def closed(self):
+        return self._fd is None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -72,6 +72,8 @@ void grib_index_delete(grib_index* index);
 
 int grib_count_in_file(grib_context* c, FILE* f,int* n);
 grib_handle* grib_handle_new_from_file(grib_context* c, FILE* f, int* error);
+grib_handle* grib_new_from_file(grib_context* c, FILE* f, int headers_only, int* error);
+grib_handle* grib_handle_new_from_message(grib_context* c, const void* data, size_t data_len);
 grib_handle* grib_handle_new_from_message_copy(grib_context* c, const void* data, size_t data_len);
 grib_handle* grib_handle_new_from_samples (grib_context* c, const char* sample_name);
 grib_handle* grib_handle_clone(const grib_handle* h);
@@ -119,6 +121,7 @@ int grib_set_long(grib_handle* h, const char* key, long val);
 int grib_set_double(grib_handle* h, const char* key, double val);
 int grib_set_string(grib_handle* h, const char* key, const char* mesg, size_t *length);
 int grib_set_double_array(grib_handle* h, const char*  key , const double*        vals   , size_t length);
+int grib_set_float_array(grib_handle* h, const char*  key , const float*        vals   , size_t length);
 int grib_set_long_array(grib_handle* h, const char*  key , const long* vals, size_t length);
 
 int grib_set_string_array(grib_handle* h, const char *key, const char **vals, size_t length);
@@ -169,6 +172,7 @@ int grib_get_native_type(const grib_handle* h, const char* name,int* type);
 int grib_get_message_offset(const grib_handle* h,long int* offset);
 
 int grib_set_values(grib_handle* h,grib_values*  grib_values , size_t arg_count);
+int grib_set_values_silent(grib_handle* h, grib_values* grib_values, size_t arg_count, int silent);
 int grib_is_missing(const grib_handle* h, const char* key, int* err);
 int grib_is_defined(const grib_handle* h, const char* key);
 int grib_set_missing(grib_handle* h, const char* key);
@@ -25,8 +25,10 @@ Numpy is a package used for scientific computing in Python and an efficient cont
 
 """
 
+import collections
 import os
 import sys
+import threading
 from functools import wraps
 
 import numpy as np
@@ -165,6 +167,83 @@ def err_last(func):
     return wrapper
 
 
+# Buffers backing the handles created without copying the message
+# (see put_handle). They are kept alive, keyed by message id, until the
+# handle is released.
+_handle_buffers = {}
+
+
+class _KeyTypeCache:
+    """Size-bounded LRU cache of the native type of keys, and whether they
+    are arrays, by message template"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(cache_key)
+            return entry
+
+    def put(self, cache_key, entry):
+        with self._lock:
+            self._entries[cache_key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+_key_types = _KeyTypeCache()
+
+# Octets of each section (as offsets from its start, by edition and section
+# number) identifying the template of a GRIB message, and hence the types of
+# its keys: lengths, tables versions, centre, local definition, and the grid,
+# product and data representation templates
+_SIGNATURE_OCTETS = {
+    1: {
+        1: ((0, 5), (6, 8), (9, 10), (20, 21), (25, 26), (40, 41)),
+        2: ((0, 6),),
+        3: (),
+        4: ((3, 4),),
+    },
+    2: {
+        1: ((5, 7), (9, 11)),
+        2: ((0, 7),),
+        3: ((0, 6), (10, 14)),
+        4: ((0, 9),),
+        5: ((9, 11),),
+        6: ((5, 6),),
+        7: (),
+    },
+}
+
+# Template signature of the handles, by message id. Dropped when a handle is
+# modified or released.
+_handle_signatures = {}
+
+
 def get_handle(msgid):
     h = ffi.cast("grib_handle*", msgid)
     if h == ffi.NULL:
@@ -172,10 +251,14 @@ def get_handle(msgid):
     return h
 
 
-def put_handle(handle):
+def put_handle(handle, buffer=None):
     if handle == ffi.NULL:
         raise errors.NullHandleError("put_handle: Bad message ID (handle is NULL)")
-    return int(ffi.cast("size_t", handle))
+    msgid = int(ffi.cast("size_t", handle))
+    if buffer is not None:
+        # The handle does not own its message: keep it alive until released
+        _handle_buffers[msgid] = buffer
+    return msgid
 
 
 def get_multi_handle(msgid):
@@ -405,9 +488,12 @@ def grib_new_from_file(fileobj, headers_only=False):
     @exception CodesInternalError
     """
 
-    err, h = err_last(lib.codes_handle_new_from_file)(
-        ffi.NULL, fileobj, CODES_PRODUCT_GRIB
-    )
+    if headers_only:
+        err, h = err_last(lib.grib_new_from_file)(ffi.NULL, fileobj, 1)
+    else:
+        err, h = err_last(lib.codes_handle_new_from_file)(
+            ffi.NULL, fileobj, CODES_PRODUCT_GRIB
+        )
     if err:
         if err == lib.GRIB_END_OF_FILE:
             return None
@@ -485,6 +571,8 @@ def grib_release(msgid):
     """
     h = get_handle(msgid)
     GRIB_CHECK(lib.grib_handle_delete(h))
+    _handle_buffers.pop(msgid, None)
+    _handle_signatures.pop(msgid, None)
 
 
 @require(msgid=int, key=str)
@@ -521,6 +609,7 @@ def grib_set_string(msgid, key, value):
     bvalue = value.encode(ENC)
     length_p = ffi.new("size_t *", len(bvalue))
     GRIB_CHECK(lib.grib_set_string(h, key.encode(ENC), bvalue, length_p))
+    _handle_signatures.pop(msgid, None)
 
 
 def grib_gribex_mode_on():
@@ -542,19 +631,22 @@ def grib_gribex_mode_off():
 
 
 @require(msgid=int, fileobj=file)
-def grib_write(msgid, fileobj):
+def grib_write(msgid, fileobj, flush=True):
     """
     @brief Write a message to a file.
 
+    The message buffer is written without being copied first.
+
     \b Examples: \ref grib_set_keys.py "grib_set_keys.py"
 
     @param msgid      id of the message loaded in memory
     @param fileobj    python file object
+    @param flush      whether to flush the file object after writing
     @exception CodesInternalError
     """
-    msg_bytes = grib_get_message(msgid)
-    fileobj.write(msg_bytes)
-    fileobj.flush()
+    fileobj.write(grib_get_message(msgid, copy=False))
+    if flush:
+        fileobj.flush()
 
 
 @require(multigribid=int, fileobj=file)
@@ -1019,6 +1111,7 @@ def grib_set_long(msgid, key, value):
 
     h = get_handle(msgid)
     GRIB_CHECK(lib.grib_set_long(h, key.encode(ENC), value))
+    _handle_signatures.pop(msgid, None)
 
 
 @require(msgid=int, key=str, value=(int, float, np.float16, np.float32, str))
@@ -1040,6 +1133,7 @@ def grib_set_double(msgid, key, value):
         raise TypeError("Invalid type")
     h = get_handle(msgid)
     GRIB_CHECK(lib.grib_set_double(h, key.encode(ENC), value))
+    _handle_signatures.pop(msgid, None)
 
 
 @require(samplename=str, product_kind=int)
@@ -1144,6 +1238,7 @@ def codes_bufr_copy_data(msgid_src, msgid_dst):
     h_src = get_handle(msgid_src)
     h_dst = get_handle(msgid_dst)
     err = lib.codes_bufr_copy_data(h_src, h_dst)
+    _handle_signatures.pop(msgid_dst, None)
     GRIB_CHECK(err)
     return msgid_dst
 
@@ -1207,22 +1302,65 @@ def grib_set_double_array(msgid, key, inarray):
         a = inarray
 
     GRIB_CHECK(lib.grib_set_double_array(h, key.encode(ENC), a, length))
+    _handle_signatures.pop(msgid, None)
 
 
 @require(msgid=int, key=str)
-def grib_get_double_array(msgid, key):
+def grib_set_float_array(msgid, key, inarray):
+    """
+    @brief Set the value of the key to a float (single precision) array.
+
+    The input array can be a numpy.ndarray or a python sequence like tuple, list, array, ...
+    A numpy.ndarray of float32 is passed to ecCodes without conversion, unless
+    the key cannot be set from single precision values, in which case the
+    values are converted to double precision.
+
+    @param msgid    id of the message loaded in memory
+    @param key      key name
+    @param inarray  tuple,list,array,numpy.ndarray
+    @exception CodesInternalError
+    """
+    h = get_handle(msgid)
+    nd = np.ascontiguousarray(inarray, dtype=np.float32)
+    a = ffi.cast("float*", nd.ctypes.data)
+    err = lib.grib_set_float_array(h, key.encode(ENC), a, nd.size)
+    if err == lib.GRIB_NOT_IMPLEMENTED:
+        # Not supported by all the packing types
+        grib_set_double_array(msgid, key, nd.astype(np.float64))
+        return
+    GRIB_CHECK(err)
+    _handle_signatures.pop(msgid, None)
+
+
+def _output_array(out, nval, dtype):
+    """Check an output array given by the caller, or allocate one"""
+    if out is None:
+        return np.empty((nval,), dtype=dtype)
+    if not isinstance(out, np.ndarray) or out.dtype != dtype:
+        raise TypeError(f"Output array must be a numpy.ndarray of {dtype}")
+    if out.size != nval:
+        raise ValueError(f"Output array has {out.size} elements, expected {nval}")
+    if not out.flags["C_CONTIGUOUS"] or not out.flags["WRITEABLE"]:
+        raise ValueError("Output array must be C-contiguous and writeable")
+    return out
+
+
+@require(msgid=int, key=str)
+def grib_get_double_array(msgid, key, out=None):
     """
     @brief Get the value of the key as a NumPy array of doubles.
 
     @param msgid   id of the message loaded in memory
     @param key     key name
-    @return        numpy.ndarray
+    @param out     optional C-contiguous float64 numpy.ndarray to write the
+                   values into, e.g. a row of a larger array
+    @return        numpy.ndarray, out if given
     @exception CodesInternalError
     """
     h = get_handle(msgid)
     nval = grib_get_size(msgid, key)
     length_p = ffi.new("size_t*", nval)
-    arr = np.empty((nval,), dtype="float64")
+    arr = _output_array(out, nval, np.float64)
     vals_p = ffi.cast("double *", arr.ctypes.data)
     err = lib.grib_get_double_array(h, key.encode(ENC), vals_p, length_p)
     GRIB_CHECK(err)
@@ -1230,19 +1368,21 @@ def grib_get_double_array(msgid, key):
 
 
 @require(msgid=int, key=str)
-def grib_get_float_array(msgid, key):
+def grib_get_float_array(msgid, key, out=None):
     """
     @brief Get the value of the key as a NumPy array of floats.
 
     @param msgid   id of the message loaded in memory
     @param key     key name
-    @return        numpy.ndarray
+    @param out     optional C-contiguous float32 numpy.ndarray to write the
+                   values into, e.g. a row of a larger array
+    @return        numpy.ndarray, out if given
     @exception CodesInternalError
     """
     h = get_handle(msgid)
     nval = grib_get_size(msgid, key)
     length_p = ffi.new("size_t*", nval)
-    arr = np.empty((nval,), dtype="float32")
+    arr = _output_array(out, nval, np.float32)
     vals_p = ffi.cast("float *", arr.ctypes.data)
     err = lib.grib_get_float_array(h, key.encode(ENC), vals_p, length_p)
     GRIB_CHECK(err)
@@ -1303,6 +1443,7 @@ def grib_set_string_array(msgid, key, inarray):
     values_keepalive = [ffi.new("char[]", s.encode(ENC)) for s in inarray]
     values_p = ffi.new("const char *[]", values_keepalive)
     GRIB_CHECK(lib.grib_set_string_array(h, key.encode(ENC), values_p, size))
+    _handle_signatures.pop(msgid, None)
 
 
 @require(msgid=int, key=str)
@@ -1323,6 +1464,7 @@ def grib_set_long_array(msgid, key, inarray):
     if isinstance(inarray, np.ndarray):
         inarray = inarray.tolist()
     GRIB_CHECK(lib.grib_set_long_array(h, key.encode(ENC), inarray, len(inarray)))
+    _handle_signatures.pop(msgid, None)
 
 
 @require(msgid=int, key=str)
@@ -1395,6 +1537,7 @@ def grib_copy_namespace(gribid_src, namespace, gribid_dest):
     h_src = get_handle(gribid_src)
     h_dest = get_handle(gribid_dest)
     GRIB_CHECK(lib.grib_copy_namespace(h_src, namespace.encode(ENC), h_dest))
+    _handle_signatures.pop(gribid_dest, None)
 
 
 @require(filename=str, keys=(tuple, list))
@@ -1746,6 +1889,67 @@ def grib_set_missing(msgid, key):
     """
     h = get_handle(msgid)
     GRIB_CHECK(lib.grib_set_missing(h, key.encode(ENC)))
+    _handle_signatures.pop(msgid, None)
+
+
+@require(msgid=int)
+def grib_set_many(msgid, key_vals):
+    """
+    @brief Set the values of several scalar keys in a single call.
+
+    The values are passed to the library as typed values, in one call to
+    grib_set_values, without being formatted as a string. A python int is set
+    as a long, a float as a double and a str as a string. Keys are set in order,
+    but keys that are not found are tried again after the others, as long as
+    some keys could be set, so a key may end up being set after the keys
+    following it.
+
+    @see grib_set_key_vals
+
+    @param msgid      id of the message loaded in memory
+    @param key_vals   dictionary, or sequence of (key, value) pairs
+    @exception CodesInternalError, with the name of the first key that could not
+               be set in its key attribute
+    """
+    if isinstance(key_vals, dict):
+        key_vals = key_vals.items()
+    key_vals = list(key_vals)
+    if not key_vals:
+        return
+    count = len(key_vals)
+    values = ffi.new("grib_values[]", count)
+    # The strings must outlive the call
+    strings = []
+    for i, (key, value) in enumerate(key_vals):
+        name = ffi.new("char[]", key.encode(ENC))
+        strings.append(name)
+        values[i].name = name
+        if isinstance(value, (int, np.integer)):
+            values[i].type = lib.GRIB_TYPE_LONG
+            values[i].long_value = value
+        elif isinstance(value, (float, np.floating)):
+            values[i].type = lib.GRIB_TYPE_DOUBLE
+            values[i].double_value = value
+        elif isinstance(value, str):
+            string = ffi.new("char[]", value.encode(ENC))
+            strings.append(string)
+            values[i].type = lib.GRIB_TYPE_STRING
+            values[i].string_value = string
+        else:
+            raise GribInternalError(
+                "Invalid type of value when setting key '%s'." % key
+            )
+    h = get_handle(msgid)
+    err = lib.grib_set_values_silent(h, values, count, 1)
+    _handle_signatures.pop(msgid, None)
+    for i in range(count):
+        if values[i].error:
+            try:
+                errors.raise_grib_error(values[i].error)
+            except GribInternalError as e:
+                e.key = key_vals[i][0]
+                raise
+    GRIB_CHECK(err)
 
 
 @require(gribid=int)
@@ -1793,6 +1997,7 @@ def grib_set_key_vals(gribid, key_vals):
     GRIB_CHECK(err)
     err = lib.grib_set_values(h, values, count_p[0])
     GRIB_CHECK(err)
+    _handle_signatures.pop(gribid, None)
 
 
 @require(msgid=int, key=str)
@@ -1972,6 +2177,105 @@ def grib_find_nearest_multiple(gribid, is_lsm, inlats, inlons):
     return tuple(result)
 
 
+def _double_ptr(array):
+    return ffi.cast("double *", array.ctypes.data)
+
+
+@require(gribid=int)
+def grib_find_nearest_arrays(gribid, inlats, inlons, is_lsm=False, npoints=1):
+    """
+    @brief Find the nearest grid point, or the nearest four grid points, to each
+    of a set of points given as NumPy arrays.
+
+    Unlike @ref grib_find_nearest_multiple, the results are returned as arrays,
+    without creating Python objects per point. With npoints=4, a single nearest
+    object is used for all the points.
+
+    @param gribid     id of the GRIB message loaded in memory
+    @param inlats     latitudes of the points to search for
+    @param inlons     longitudes of the points to search for
+    @param is_lsm     True if the nearest land point is required otherwise False.
+                      Only supported with npoints=1
+    @param npoints    1 or 4 nearest grid points
+    @return           Bunch of the lat, lon, value, distance and index arrays, of
+                      shape (n,) with npoints=1, or (n, 4) with npoints=4
+    @exception CodesInternalError
+    """
+    inlats = np.ascontiguousarray(inlats, dtype=np.float64).ravel()
+    inlons = np.ascontiguousarray(inlons, dtype=np.float64).ravel()
+    n = len(inlats)
+    if len(inlons) != n:
+        raise ValueError(
+            "grib_find_nearest_arrays: input arrays inlats and inlons must have the same length"
+        )
+    if npoints not in (1, 4):
+        raise ValueError("grib_find_nearest_arrays: npoints must be 1 or 4")
+    if is_lsm and npoints != 1:
+        raise errors.FunctionNotImplementedError(
+            "grib_find_nearest_arrays is_lsm argument: Only supported with 1 point"
+        )
+
+    h = get_handle(gribid)
+    shape = (n,) if npoints == 1 else (n, npoints)
+    outlats = np.empty(shape, dtype=np.float64)
+    outlons = np.empty(shape, dtype=np.float64)
+    values = np.empty(shape, dtype=np.float64)
+    distances = np.empty(shape, dtype=np.float64)
+    indexes = np.empty(shape, dtype=np.intc)
+
+    if npoints == 1:
+        if n:
+            err = lib.grib_nearest_find_multiple(
+                h,
+                is_lsm,
+                _double_ptr(inlats),
+                _double_ptr(inlons),
+                n,
+                _double_ptr(outlats),
+                _double_ptr(outlons),
+                _double_ptr(values),
+                _double_ptr(distances),
+                ffi.cast("int *", indexes.ctypes.data),
+            )
+            GRIB_CHECK(err)
+    else:
+        err, nid = err_last(lib.grib_nearest_new)(h)
+        GRIB_CHECK(err)
+        try:
+            outlats_p = _double_ptr(outlats)
+            outlons_p = _double_ptr(outlons)
+            values_p = _double_ptr(values)
+            distances_p = _double_ptr(distances)
+            indexes_p = ffi.cast("int *", indexes.ctypes.data)
+            size = ffi.new("size_t *")
+            flags = 0
+            for i in range(n):
+                size[0] = npoints
+                k = i * npoints
+                err = lib.grib_nearest_find(
+                    nid,
+                    h,
+                    inlats[i],
+                    inlons[i],
+                    flags,
+                    outlats_p + k,
+                    outlons_p + k,
+                    values_p + k,
+                    distances_p + k,
+                    indexes_p + k,
+                    size,
+                )
+                GRIB_CHECK(err)
+                # The grid and values do not change between points
+                flags = GRIB_NEAREST_SAME_GRID | GRIB_NEAREST_SAME_DATA
+        finally:
+            lib.grib_nearest_delete(nid)
+
+    return Bunch(
+        lat=outlats, lon=outlons, value=values, distance=distances, index=indexes
+    )
+
+
 @require(msgid=int, key=str)
 def grib_get_native_type(msgid, key):
     """
@@ -1994,6 +2298,108 @@ def grib_get_native_type(msgid, key):
         return None
 
 
+def _grib_sections(view):
+    """Yield the number and the offset of each section of a GRIB message"""
+    size = len(view)
+    if view[7] == 1:
+        flag = view[15] if size > 15 else 0
+        present = (True, flag & 0x80, flag & 0x40, True)
+        pos = 8
+        for number in range(1, 5):
+            if not present[number - 1]:
+                continue
+            if pos + 4 > size:
+                return
+            yield number, pos
+            pos += int.from_bytes(view[pos : pos + 3], "big")
+    else:
+        pos = 16
+        while pos + 5 <= size and view[pos : pos + 4] != b"7777":
+            length = int.from_bytes(view[pos : pos + 4], "big")
+            if length < 5:
+                return
+            yield view[pos + 4], pos
+            pos += length
+
+
+def _template_signature(msgid):
+    """Return the octets identifying the template of a GRIB message
+
+    The octets are read from the message buffer, with a single call to the
+    library. None is returned for other products, whose key types are not
+    cached.
+    """
+    try:
+        return _handle_signatures[msgid]
+    except KeyError:
+        pass
+    h = get_handle(msgid)
+    message_p = ffi.new("const void**")
+    message_length_p = ffi.new("size_t*")
+    signature = None
+    if lib.grib_get_message(h, message_p, message_length_p) == lib.GRIB_SUCCESS:
+        view = memoryview(
+            ffi.buffer(ffi.cast("char*", message_p[0]), message_length_p[0])
+        )
+        if view[:4] == b"GRIB" and len(view) > 16 and view[7] in _SIGNATURE_OCTETS:
+            octets = _SIGNATURE_OCTETS[view[7]]
+            signature = [view[7]]
+            for number, pos in _grib_sections(view):
+                signature.append(number)
+                for start, stop in octets.get(number, ()):
+                    signature.append(bytes(view[pos + start : pos + stop]))
+            signature = tuple(signature)
+    _handle_signatures[msgid] = signature
+    return signature
+
+
+@require(msgid=int, key=str)
+def grib_get_key_type(msgid, key):
+    """
+    @brief Retrieve the native type of a key, and whether it is an array.
+
+    For GRIB messages, the result is cached for all the messages sharing the
+    same template (edition, tables versions, centre, local definition, grid,
+    product definition and data representation), so that it is only looked
+    up once. Whether the key is an array is a hint, as the size of a key can
+    change between messages of the same template.
+
+    @param msgid   id of the message loaded in memory
+    @param key     key we want to find out the type for
+    @return        tuple of the type of the key (int, float, str, bytes or None)
+                   and whether the key is an array
+    @exception CodesInternalError
+    """
+    signature = _template_signature(msgid)
+    if signature is None:
+        return grib_get_native_type(msgid, key), grib_get_size(msgid, key) > 1
+    cache_key = (signature, key)
+    entry = _key_types.get(cache_key)
+    if entry is None:
+        entry = (grib_get_native_type(msgid, key), grib_get_size(msgid, key) > 1)
+        _key_types.put(cache_key, entry)
+    return entry
+
+
+def grib_key_type_cache_info():
+    """
+    @brief Get statistics about the cache of key types.
+
+    @see grib_get_key_type
+
+    @return  dict with the number of "hits" and "misses", and the current
+             "size" and "maxsize" of the cache
+    """
+    return _key_types.info()
+
+
+def grib_key_type_cache_clear():
+    """
+    @brief Empty the cache of key types, and reset its statistics.
+    """
+    _key_types.clear()
+
+
 @require(msgid=int, key=str)
 def grib_get(msgid, key, ktype=None):
     r"""
@@ -2001,7 +2407,8 @@ def grib_get(msgid, key, ktype=None):
 
     The type of value returned depends on the native type of the requested key.
     The type of value returned can be forced by using the type argument of the
-    function. The ktype argument can be int, float, str or bytes.
+    function. The ktype argument can be int, float, numpy.float32, numpy.float64,
+    str or bytes.
 
     The \em msgid references a message loaded in memory.
 
@@ -2024,8 +2431,10 @@ def grib_get(msgid, key, ktype=None):
     result = None
     if ktype is int:
         result = grib_get_long(msgid, key)
-    elif ktype is float:
+    elif ktype is float or ktype is np.float64:
         result = grib_get_double(msgid, key)
+    elif ktype is np.float32:
+        result = np.float32(grib_get_double(msgid, key))
     elif ktype is str:
         result = grib_get_string(msgid, key)
     elif ktype is bytes:
@@ -2035,7 +2444,7 @@ def grib_get(msgid, key, ktype=None):
 
 
 @require(msgid=int, key=str)
-def grib_get_array(msgid, key, ktype=None):
+def grib_get_array(msgid, key, ktype=None, out=None):
     """
     @brief Get the contents of an array key.
 
@@ -2044,12 +2453,25 @@ def grib_get_array(msgid, key, ktype=None):
     The type of value returned can be forced by using the ktype argument of the function.
     The ktype argument can be int, float, float32, float64, str or bytes.
 
+    Floating-point values can be written into an existing array given as out,
+    whose dtype (float32 or float64) is then used if ktype is not specified.
+
     @param msgid  id of the message loaded in memory
     @param key    the key to get the value for
     @param ktype  the type we want the output in, native type if not specified
+    @param out    optional C-contiguous numpy.ndarray to write the values into
     @return       numpy.ndarray or None
     @exception CodesInternalError
     """
+    if out is not None:
+        if ktype is None:
+            ktype = getattr(out, "dtype", np.dtype(float)).type
+        if ktype is np.float32:
+            return grib_get_float_array(msgid, key, out=out)
+        if ktype is float or ktype is np.float64:
+            return grib_get_double_array(msgid, key, out=out)
+        raise TypeError("An output array is only supported for float32 and float64")
+
     if ktype is None:
         ktype = grib_get_native_type(msgid, key)
 
@@ -2073,7 +2495,7 @@ def grib_get_array(msgid, key, ktype=None):
 
 
 @require(gribid=int)
-def grib_get_values(gribid, ktype=float):
+def grib_get_values(gribid, ktype=float, out=None):
     """
     @brief Retrieve the contents of the 'values' key for a GRIB message.
 
@@ -2082,16 +2504,21 @@ def grib_get_values(gribid, ktype=float):
     \b Examples: \ref grib_print_data.py "grib_print_data.py", \ref grib_samples.py "grib_samples.py"
 
     @param gribid    id of the GRIB loaded in memory
-    @param ktype     data type of the result: numpy.float32 or numpy.float64
-    @return          numpy.ndarray
+    @param ktype     data type of the result: numpy.float32 or numpy.float64,
+                     ignored if out is given
+    @param out       optional C-contiguous numpy.ndarray of float32 or float64
+                     to write the values into, e.g. a row of a larger array
+    @return          numpy.ndarray, out if given
     @exception CodesInternalError
     """
     result = None
 
+    if out is not None:
+        ktype = getattr(out, "dtype", np.dtype(float)).type
     if ktype is np.float32:
-        result = grib_get_float_array(gribid, "values")
+        result = grib_get_float_array(gribid, "values", out=out)
     elif ktype is np.float64 or ktype is float:
-        result = grib_get_double_array(gribid, "values")
+        result = grib_get_double_array(gribid, "values", out=out)
     else:
         raise TypeError(
             f"Unsupported data type {ktype}. Supported data types are numpy.float32 and numpy.float64"
@@ -2122,6 +2549,33 @@ def grib_get_data(gribid):
     return tuple(result)
 
 
+@require(gribid=int)
+def grib_get_data_arrays(gribid):
+    """
+    @brief Get the latitudes, longitudes and data values as NumPy arrays.
+
+    Unlike @ref grib_get_data, no Python object is created per grid point:
+    the arrays are filled directly by ecCodes.
+
+    @param gribid   id of the GRIB loaded in memory
+    @return         tuple of the latitude, longitude and value arrays (float64)
+    @exception CodesInternalError
+    """
+    npoints = grib_get(gribid, "numberOfDataPoints", ktype=int)
+    lats = np.empty(npoints, dtype=np.float64)
+    lons = np.empty(npoints, dtype=np.float64)
+    values = np.empty(npoints, dtype=np.float64)
+    h = get_handle(gribid)
+    err = lib.grib_get_data(
+        h,
+        ffi.cast("double *", lats.ctypes.data),
+        ffi.cast("double *", lons.ctypes.data),
+        ffi.cast("double *", values.ctypes.data),
+    )
+    GRIB_CHECK(err)
+    return lats, lons, values
+
+
 @require(gribid=int)
 def grib_set_values(gribid, values):
     """
@@ -2196,7 +2650,9 @@ def grib_set_array(msgid, key, value):
     except TypeError:
         pass
 
-    if isinstance(val0, (float, np.float16, np.float32, np.float64)):
+    if isinstance(value, np.ndarray) and value.dtype == np.float32:
+        grib_set_float_array(msgid, key, value)
+    elif isinstance(val0, (float, np.float16, np.float32, np.float64)):
         grib_set_double_array(msgid, key, value)
     elif isinstance(val0, str):
         grib_set_string_array(msgid, key, value)
@@ -2377,15 +2833,20 @@ def codes_get_gaussian_latitudes(order):
 
 
 @require(msgid=int)
-def grib_get_message(msgid):
+def grib_get_message(msgid, copy=True):
     """
     @brief Get the binary message.
 
     Returns the binary string message associated with the message identified by msgid.
 
+    With copy=False, a read-only memoryview of the message buffer of the handle is
+    returned instead, without copying it. It is only valid until the message is
+    modified or released, and must not be used afterwards.
+
     @see grib_new_from_message
 
     @param msgid      id of the message loaded in memory
+    @param copy       whether to copy the message to a bytes object
     @return           binary string message associated with msgid
     @exception CodesInternalError
     """
@@ -2398,33 +2859,50 @@ def grib_get_message(msgid):
     fixed_length_buffer = ffi.buffer(
         ffi.cast("char*", message_p[0]), message_length_p[0]
     )
+    if not copy:
+        return memoryview(fixed_length_buffer).toreadonly()
     # Convert to bytes
     return fixed_length_buffer[:]
 
 
-@require(message=(bytes, str, memoryview))
-def grib_new_from_message(message):
+@require(message=(bytes, bytearray, str, memoryview))
+def grib_new_from_message(message, copy=True):
     """
     @brief Create a handle from a message in memory.
 
     Create a new message from the input binary string and return its id.
 
+    By default the message is copied into a buffer owned by the handle.
+    If copy is False, the handle is created directly over the input buffer,
+    which is kept alive until @ref codes_release is called. In that case
+    the buffer must not be modified while the handle exists, and setting
+    keys may write into it. Read-only buffers, such as bytes, are always
+    copied.
+
     @see grib_get_message
 
     @param         message binary string message
+    @param         copy    whether or not to copy the message
     @return        msgid of the newly created message
     @exception CodesInternalError
     """
-    if isinstance(message, memoryview):
-        message = ffi.from_buffer(message)
-
     if isinstance(message, str):
         message = message.encode(ENC)
 
-    h = lib.grib_handle_new_from_message_copy(ffi.NULL, message, len(message))
+    if not copy and memoryview(message).readonly:
+        # Setting keys would write into the immutable buffer
+        copy = True
+
+    if isinstance(message, memoryview) or not copy:
+        message = ffi.from_buffer(message)
+
+    if copy:
+        h = lib.grib_handle_new_from_message_copy(ffi.NULL, message, len(message))
+    else:
+        h = lib.grib_handle_new_from_message(ffi.NULL, message, len(message))
     if h == ffi.NULL:
         raise errors.MessageInvalidError("new_from_message failed")
-    return put_handle(h)
+    return put_handle(h, buffer=None if copy else message)
 
 
 def codes_definition_path():
@@ -13,6 +13,7 @@
 Tests of the ecCodes Python3 bindings
 """
 
+import io
 import math
 import os.path
 import sys
@@ -215,6 +216,18 @@ def test_new_from_message_memoryview():
         eccodes.codes_release(newgid)
 
 
+def test_new_from_message_no_copy():
+    with open(TEST_GRIB_TIGGE_DATA, "rb") as f:
+        data = f.read()
+    mv = memoryview(data)[432:864]
+    newgid = eccodes.codes_new_from_message(mv, copy=False)
+    assert eccodes.codes_get(newgid, "shortName") == "msl"
+    assert eccodes.codes_get(newgid, "totalLength") == 432
+    del mv
+    assert eccodes.codes_get_size(newgid, "values") == 212065
+    eccodes.codes_release(newgid)
+
+
 def test_gts_header():
     eccodes.codes_gts_header(True)
     eccodes.codes_gts_header(False)
@@ -545,6 +558,18 @@ def test_grib_get_data():
     eccodes.codes_release(gid)
 
 
+def test_grib_get_data_arrays():
+    gid = eccodes.codes_grib_new_from_samples("reduced_gg_pl_32_grib2")
+    lats, lons, values = eccodes.codes_grib_get_data_arrays(gid)
+    ggd = eccodes.codes_grib_get_data(gid)
+    assert lats.dtype == lons.dtype == values.dtype == np.float64
+    assert lats.shape == lons.shape == values.shape == (6114,)
+    assert np.array_equal(lats, [p.lat for p in ggd])
+    assert np.array_equal(lons, [p.lon for p in ggd])
+    assert np.array_equal(values, [p.value for p in ggd])
+    eccodes.codes_release(gid)
+
+
 def test_grib_get_double_element():
     gid = eccodes.codes_grib_new_from_samples("gg_sfc_grib2")
     elem = eccodes.codes_get_double_element(gid, "values", 1)
@@ -634,6 +659,33 @@ def test_grib_nearest_multiple():
         eccodes.codes_grib_find_nearest_multiple(gid, is_lsm, (1, 2), (1, 2, 3))
 
 
+def test_grib_nearest_arrays():
+    gid = eccodes.codes_grib_new_from_samples("reduced_gg_ml_grib2")
+    inlats = np.array([30, 13, 10])
+    inlons = np.array([-20, 234, 20])
+    nearest = eccodes.codes_grib_find_nearest_arrays(gid, inlats, inlons)
+    assert nearest.index.tolist() == [1770, 2500, 2552]
+    assert nearest.lat.shape == nearest.distance.shape == (3,)
+    expected = eccodes.codes_grib_find_nearest_multiple(
+        gid, False, inlats.tolist(), inlons.tolist()
+    )
+    assert nearest.value.tolist() == [p.value for p in expected]
+    assert nearest.lon.tolist() == [p.lon for p in expected]
+
+    nearest = eccodes.codes_grib_find_nearest_arrays(gid, inlats, inlons, npoints=4)
+    assert nearest.index.shape == (3, 4)
+    assert sorted(nearest.index[2]) == [2424, 2425, 2552, 2553]
+    for i in range(3):
+        expected = eccodes.codes_grib_find_nearest(gid, inlats[i], inlons[i], False, 4)
+        assert nearest.index[i].tolist() == [p.index for p in expected]
+        assert nearest.distance[i].tolist() == [p.distance for p in expected]
+    with pytest.raises(ValueError):
+        eccodes.codes_grib_find_nearest_arrays(gid, inlats, inlons, npoints=5)
+    with pytest.raises(ValueError):
+        eccodes.codes_grib_find_nearest_arrays(gid, (1, 2), (1, 2, 3))
+    eccodes.codes_release(gid)
+
+
 def test_grib_ecc_1042():
     # Issue ECC-1042: Python3 interface writes integer arrays incorrectly
     gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
@@ -1101,3 +1153,132 @@ def test_grib_nearest2():
 
     eccodes.codes_release(gid)
     eccodes.codes_grib_nearest_delete(nid)
+
+
+def test_grib_new_from_file_headers_only():
+    with open(TEST_GRIB_ERA5_DATA, "rb") as f:
+        gid = eccodes.codes_grib_new_from_file(f, headers_only=True)
+        assert eccodes.codes_get(gid, "shortName") == "z"
+        assert eccodes.codes_get(gid, "numberOfValues") == 7320
+        with pytest.raises(eccodes.KeyValueNotFoundError):
+            eccodes.codes_get_values(gid)
+        eccodes.codes_release(gid)
+        count = 1
+        while True:
+            gid = eccodes.codes_new_from_file(
+                f, eccodes.CODES_PRODUCT_GRIB, headers_only=True
+            )
+            if gid is None:
+                break
+            count += 1
+            eccodes.codes_release(gid)
+    assert count == 160
+
+
+def test_key_type_cache():
+    eccodes.codes_key_type_cache_clear()
+    with open(TEST_GRIB_ERA5_DATA, "rb") as f:
+        gid1 = eccodes.codes_grib_new_from_file(f)
+        gid2 = eccodes.codes_grib_new_from_file(f)
+    assert eccodes.codes_get_key_type(gid1, "level") == (int, False)
+    assert eccodes.codes_get_key_type(gid1, "values") == (float, True)
+    assert eccodes.codes_get_key_type(gid2, "level") == (int, False)
+    assert eccodes.codes_get_key_type(gid2, "shortName") == (str, False)
+    info = eccodes.codes_key_type_cache_info()
+    assert info["hits"] == 1
+    assert info["misses"] == 3
+    assert info["size"] == 3
+    # Changing the template of a message changes its signature
+    eccodes.codes_set(gid2, "centre", "kwbc")
+    assert eccodes.codes_get_key_type(gid2, "level") == (int, False)
+    assert eccodes.codes_key_type_cache_info()["misses"] == 4
+    eccodes.codes_set(gid2, "edition", 2)
+    assert eccodes.codes_get_key_type(gid2, "level") == (int, False)
+    assert eccodes.codes_key_type_cache_info()["misses"] == 5
+    # The key types of other products are not cached
+    bid = eccodes.codes_bufr_new_from_samples("BUFR4")
+    assert eccodes.codes_get_key_type(bid, "edition") == (int, False)
+    assert eccodes.codes_key_type_cache_info()["size"] == 5
+    eccodes.codes_release(bid)
+    eccodes.codes_release(gid1)
+    eccodes.codes_release(gid2)
+    eccodes.codes_key_type_cache_clear()
+    assert eccodes.codes_key_type_cache_info() == {
+        "hits": 0,
+        "misses": 0,
+        "size": 0,
+        "maxsize": 4096,
+    }
+
+
+def test_grib_codes_set_float_array():
+    gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+    values = eccodes.codes_get_values(gid, np.float32) + np.float32(1.5)
+    eccodes.codes_set_array(gid, "values", values)
+    assert np.allclose(eccodes.codes_get_values(gid, np.float32), values)
+    eccodes.codes_set_float_array(gid, "values", values + 1)
+    assert np.allclose(eccodes.codes_get_values(gid), values + 1)
+    assert isinstance(eccodes.codes_get(gid, "max", ktype=np.float32), np.float32)
+    eccodes.codes_release(gid)
+
+
+def test_grib_get_values_out():
+    gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+    values = eccodes.codes_get_values(gid)
+    cube = np.zeros((3, len(values)))
+    row = cube[1]
+    assert eccodes.codes_get_values(gid, out=row) is row
+    assert np.array_equal(cube[1], values)
+    assert not cube[0].any() and not cube[2].any()
+    cube32 = np.zeros((2, len(values)), np.float32)
+    eccodes.codes_get_array(gid, "values", out=cube32[0])
+    assert np.array_equal(cube32[0], values.astype(np.float32))
+    eccodes.codes_get_double_array(gid, "values", out=cube[2])
+    assert np.array_equal(cube[2], values)
+    with pytest.raises(TypeError):
+        eccodes.codes_get_double_array(gid, "values", out=cube32[1])
+    with pytest.raises(ValueError):
+        eccodes.codes_get_values(gid, out=cube[:, 0:2].ravel())
+    with pytest.raises(ValueError):
+        eccodes.codes_get_values(gid, out=cube.T[0])
+    with pytest.raises(TypeError):
+        eccodes.codes_get_array(gid, "values", ktype=int, out=cube[0])
+    eccodes.codes_release(gid)
+
+
+def test_grib_get_message_no_copy():
+    gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+    message = eccodes.codes_get_message(gid)
+    view = eccodes.codes_get_message(gid, copy=False)
+    assert isinstance(view, memoryview)
+    assert view == message
+    out = io.BytesIO()
+    eccodes.codes_write(gid, out, flush=False)
+    assert out.getvalue() == message
+    eccodes.codes_release(gid)
+
+
+def test_grib_set_many():
+    gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+    eccodes.codes_set_many(
+        gid,
+        {
+            "shortName": "t",
+            "typeOfLevel": "isobaricInhPa",
+            "level": np.int32(850),
+            "latitudeOfFirstGridPointInDegrees": 45.5,
+        },
+    )
+    assert eccodes.codes_get(gid, "shortName") == "t"
+    assert eccodes.codes_get(gid, "typeOfLevel") == "isobaricInhPa"
+    assert eccodes.codes_get(gid, "level") == 850
+    assert eccodes.codes_get(gid, "latitudeOfFirstGridPointInDegrees") == 45.5
+    eccodes.codes_set_many(gid, [("level", 500), ("dataDate", 20240101)])
+    assert eccodes.codes_get(gid, "level") == 500
+    assert eccodes.codes_get(gid, "dataDate") == 20240101
+    with pytest.raises(eccodes.KeyValueNotFoundError) as e:
+        eccodes.codes_set_many(gid, {"level": 1, "nosuchkey": 1})
+    assert e.value.key == "nosuchkey"
+    with pytest.raises(eccodes.CodesInternalError):
+        eccodes.codes_set_many(gid, {"level": [1, 2]})
+    eccodes.codes_release(gid)
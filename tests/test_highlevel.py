@@ -1,7 +1,9 @@
+import asyncio
 import collections
 import io
 import itertools
 import pathlib
+import shutil
 import sys
 
 import numpy as np
@@ -20,6 +22,26 @@ def test_filereader():
     assert count == 7
 
 
+def test_mapped_filereader():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        with eccodes.MappedFileReader(TEST_GRIB_DATA2) as reader2:
+            for message1, message2 in itertools.zip_longest(reader1, reader2):
+                assert message1 is not None
+                assert message2 is not None
+                assert message1["shortName"] == message2["shortName"]
+                assert message1["number"] == message2["number"]
+                assert np.all(message1.data == message2.data)
+
+
+def test_mapped_filereader_set():
+    with eccodes.MappedFileReader(TEST_GRIB_DATA) as reader:
+        message = next(reader)
+        message["centre"] = 98
+        assert message["centre"] == "ecmf"
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        assert next(reader)["centre"] == "cosmo"
+
+
 def test_read_message():
     with eccodes.FileReader(TEST_GRIB_DATA) as reader:
         message = next(reader)
@@ -88,6 +110,32 @@ def test_message_set_dict_with_checks():
         message.set("iDirectionIncrementInDegrees", 1.5)
 
 
+def test_message_set_dict_bulk():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message = next(reader)
+        vals = np.arange(message["numberOfValues"], dtype=float)
+        message.set(
+            {
+                "shortName": "t",
+                "level": 850,
+                "bitsPerValue": 16,
+                "values": vals,
+                "dataDate": 20240101,
+                "dataTime": 1200,
+            }
+        )
+        assert message["shortName"] == "t"
+        assert message["level"] == 850
+        assert message["dataDate"] == 20240101
+        assert message["dataTime"] == 1200
+        assert np.allclose(message.data, vals)
+        with pytest.raises(KeyError, match="nosuchkey"):
+            message.set({"level": 500, "nosuchkey": 1})
+        assert message["level"] == 500
+        with pytest.raises(eccodes.CodesInternalError):
+            message.set({"level": 500, "shortName": {}})
+
+
 def test_message_set_dict_no_checks():
     with eccodes.FileReader(TEST_GRIB_DATA) as reader:
         message = next(reader)
@@ -210,6 +258,30 @@ def test_read_memory():
             assert np.all(message1.data == message2.data)
 
 
+def test_read_memory_no_copy():
+    data = TEST_GRIB_DATA2.read_bytes()
+    # Leading garbage and padding between messages are skipped
+    buffer = bytearray(b"garbage" + data[:14760] + b"\0" * 5 + data[14760:])
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        reader2 = eccodes.MemoryReader(buffer, copy=False)
+        for message1, message2 in itertools.zip_longest(reader1, reader2):
+            assert message1 is not None
+            assert message2 is not None
+            assert message1["shortName"] == message2["shortName"]
+            assert message1["number"] == message2["number"]
+            assert np.all(message1.data == message2.data)
+    assert reader2.buf is None
+
+
+def test_read_memory_no_copy_readonly():
+    data = TEST_GRIB_DATA2.read_bytes()
+    orig = bytes(data)
+    message = next(eccodes.MemoryReader(data, copy=False))
+    message.set("level", 850)
+    assert message["level"] == 850
+    assert data == orig
+
+
 def test_read_stream():
     if sys.platform.startswith("win"):
         pytest.skip("Test disabled on Windows")
@@ -241,3 +313,612 @@ def test_read_stream():
             ]:
                 assert message1[key] == message2[key]
             assert np.all(message1.data == message2.data)
+
+
+def test_read_stream_buffer_ownership():
+    if sys.platform.startswith("win"):
+        pytest.skip("Test disabled on Windows")
+    from gribapi.gribapi import _handle_buffers
+
+    with open(TEST_GRIB_DATA, "rb") as stream:
+        messages = list(eccodes.StreamReader(stream))
+    assert len(messages) == 7
+    handles = [message._handle for message in messages]
+    assert all(handle in _handle_buffers for handle in handles)
+    assert messages[-1]["shortName"] == "lsp"
+    del messages
+    assert not any(handle in _handle_buffers for handle in handles)
+
+
+def test_read_stream_buffered():
+    class ChunkedStream:
+        # Returns at most a few bytes per read, splitting the messages
+        def __init__(self, data):
+            self._stream = io.BytesIO(data)
+
+        def read(self, size):
+            return self._stream.read(min(size, 1000))
+
+    data = TEST_GRIB_DATA2.read_bytes()
+    stream = ChunkedStream(b"garbage" + data + b"GRIB")
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        reader2 = eccodes.StreamReader(stream, buffered=True, buffer_size=4096)
+        for message1, message2 in itertools.zip_longest(reader1, reader2):
+            assert message1 is not None
+            assert message2 is not None
+            assert message1["shortName"] == message2["shortName"]
+            assert message1["number"] == message2["number"]
+            assert np.all(message1.data == message2.data)
+
+
+def test_parallel_reader():
+    keys = ("shortName", "number", "values")
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        with eccodes.ParallelReader(
+            [TEST_GRIB_DATA2, TEST_GRIB_DATA], keys=keys, workers=2, batch_size=7
+        ) as reader2:
+            results = list(reader2)
+        assert len(results) == 167
+        for message, result in zip(reader1, results):
+            assert list(result) == list(keys)
+            assert message["shortName"] == result["shortName"]
+            assert message["number"] == result["number"]
+            assert np.all(message.data == result["values"])
+    assert results[-1]["shortName"] == "lsp"
+
+
+def test_parallel_reader_unordered():
+    with eccodes.ParallelReader(
+        TEST_GRIB_DATA2, keys=("number",), workers=2, batch_size=5, ordered=False
+    ) as reader:
+        numbers = collections.Counter(result["number"] for result in reader)
+    assert numbers == collections.Counter({n: 16 for n in range(10)})
+
+
+def test_parallel_reader_empty_file(tmp_path):
+    path = tmp_path / "empty.grib"
+    path.touch()
+    with eccodes.ParallelReader([path, TEST_GRIB_DATA], keys=("shortName",)) as reader:
+        assert len(list(reader)) == 7
+
+
+def test_thread_pool_reader():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        reader2 = eccodes.ThreadPoolReader(
+            eccodes.FileReader(TEST_GRIB_DATA2), workers=3, prefetch=5
+        )
+        with reader2:
+            for message1, message2 in itertools.zip_longest(reader1, reader2):
+                assert message1 is not None
+                assert message2 is not None
+                assert message2._data is not None
+                assert message1["shortName"] == message2["shortName"]
+                assert np.all(message1.data == message2.data)
+
+
+def test_thread_pool_reader_lazy():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader1:
+        reader2 = eccodes.ThreadPoolReader(
+            eccodes.FileReader(TEST_GRIB_DATA2, lazy=True), workers=2
+        )
+        with reader2:
+            for message1, message2 in itertools.islice(zip(reader1, reader2), 10):
+                assert message2._data is not None
+                assert np.all(message1.data == message2.data)
+
+
+def test_thread_pool_reader_bufr():
+    path = SAMPLE_DATA_FOLDER / "synop_multi_subset.bufr"
+    reader = eccodes.FileReader(path, kind=eccodes.CODES_PRODUCT_BUFR)
+    with eccodes.ThreadPoolReader(reader, workers=2) as reader:
+        messages = list(reader)
+    assert len(messages) == 1
+    assert messages[0]._coder._unpacked
+
+
+def test_async_stream_reader():
+    data = TEST_GRIB_DATA2.read_bytes()
+
+    async def read_all(stream):
+        return [message async for message in eccodes.AsyncStreamReader(stream)]
+
+    async def from_stream_reader():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        return await read_all(stream)
+
+    async def from_chunks():
+        for i in range(0, len(data), 10000):
+            yield data[i : i + 10000]
+
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        expected = [(message["shortName"], message.data) for message in reader]
+    for messages in [
+        asyncio.run(from_stream_reader()),
+        asyncio.run(read_all(from_chunks())),
+    ]:
+        assert len(messages) == len(expected)
+        for message, (short_name, values) in zip(messages, expected):
+            assert message["shortName"] == short_name
+            assert np.all(message.data == values)
+
+
+def test_index(tmp_path):
+    path = tmp_path / "data.grib"
+    shutil.copyfile(TEST_GRIB_DATA2, path)
+    index_path = tmp_path / "data.grib.idx"
+    index = eccodes.open_index(path)
+    assert index_path.exists()
+    assert len(index) == 160
+    with eccodes.FileReader(path) as reader:
+        for entry, message in zip(index, reader):
+            assert entry.offset == message["offset"]
+            assert entry.size == message["totalLength"]
+            assert entry.header["shortName"] == message["shortName"]
+            assert entry.header["number"] == message["number"]
+    selected = index.select(shortName="t", level=[500, 850], number=0, dataTime=0)
+    assert [(e.header["dataDate"], e.header["level"]) for e in selected] == [
+        (20170101, 500),
+        (20170101, 850),
+        (20170102, 500),
+        (20170102, 850),
+    ]
+    with pytest.raises(KeyError):
+        index.select(centre="ecmf")
+
+    loaded = eccodes.Index.load(index_path, path)
+    assert loaded is not None
+    assert loaded.entries == index.entries
+    assert eccodes.Index.load(index_path, path, keys=["centre"]) is None
+    index = eccodes.open_index(path, keys=["centre"])
+    assert index.keys == ("centre",)
+    assert index[0].header == {"centre": "ecmf"}
+
+    # Modifying the file invalidates the index
+    with open(path, "ab") as f:
+        f.write(TEST_GRIB_DATA.read_bytes())
+    assert eccodes.Index.load(index_path, path, keys=["centre"]) is None
+    index = eccodes.open_index(path, keys=["centre"])
+    assert len(index) == 167
+    assert index[-1].header == {"centre": "cosmo"}
+
+
+def test_index_foreign_sidecar(tmp_path):
+    path = tmp_path / "data.grib"
+    shutil.copyfile(TEST_GRIB_DATA, path)
+    index_path = tmp_path / "data.grib.idx"
+    index_path.write_text("not an index")
+    index = eccodes.open_index(path)
+    assert len(index) == 7
+    assert index_path.read_text() == "not an index"
+    with pytest.raises(FileExistsError):
+        index.save(index_path)
+
+
+@pytest.mark.parametrize("sidecar", [False, True])
+def test_indexed_filereader(tmp_path, sidecar):
+    path = tmp_path / "data.grib"
+    shutil.copyfile(TEST_GRIB_DATA, path)
+    with eccodes.FileReader(path) as reader:
+        expected = [m.get_buffer() for m in reader]
+    with eccodes.FileReader.open_indexed(path, sidecar=sidecar) as reader:
+        assert len(reader) == 7
+        assert reader[1]["shortName"] == "msl"
+        assert reader[-1]["shortName"] == "lsp"
+        assert reader[np.int64(2)].data.size == 212065
+        assert [m.get_buffer() for m in reader[2:5]] == expected[2:5]
+        assert [m.get_buffer() for m in reader[[6, 0, 3]]] == [
+            expected[i] for i in (6, 0, 3)
+        ]
+        assert [m.get_buffer() for m in reader[np.array([1, 1])]] == [expected[1]] * 2
+        assert [m.get_buffer() for m in reader] == expected
+        mask = np.array([True, False, False, True, False, False, True])
+        assert [m.get_buffer() for m in reader[mask]] == [
+            expected[i] for i in (0, 3, 6)
+        ]
+        assert [m["shortName"] for m in reader[[False] * 6 + [True]]] == ["lsp"]
+        with pytest.raises(IndexError):
+            reader[mask[:3]]
+        with pytest.raises(IndexError):
+            reader[7]
+    assert (tmp_path / "data.grib.idx").exists() == sidecar
+
+
+def test_filereader_headers_only():
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        expected = [(m["shortName"], m["totalLength"]) for m in reader]
+    with eccodes.FileReader(TEST_GRIB_DATA, headers_only=True) as reader:
+        assert reader.peek().headers_only
+        messages = list(reader)
+    assert [(m["shortName"], m["totalLength"]) for m in messages] == expected
+    message = messages[0]
+    assert message.headers_only
+    assert message.copy().headers_only
+    assert "values" not in message
+    with pytest.raises(ValueError):
+        message.data
+    with pytest.raises(ValueError):
+        message.get_data_points()
+    with pytest.raises(KeyError):
+        message.get_array("values")
+    with pytest.raises(ValueError):
+        message.get_buffer()
+    with pytest.raises(ValueError):
+        message.write_to(io.BytesIO())
+    with pytest.raises(ValueError):
+        eccodes.FileReader(
+            TEST_GRIB_DATA, eccodes.CODES_PRODUCT_BUFR, headers_only=True
+        )
+
+
+def test_filereader_lazy():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        expected = [m.data for m in reader if m["shortName"] == "t"]
+    with eccodes.FileReader(TEST_GRIB_DATA2, lazy=True) as reader:
+        messages = [m for m in reader if m["shortName"] == "t"]
+    assert len(messages) == len(expected)
+    for message, values in zip(messages, expected):
+        assert message.headers_only
+        assert message._full is None
+        assert np.all(message.data == values)
+        assert np.all(message.get_array("values") == values)
+        assert np.all(message["values"] == values)
+        message.release_data()
+        assert message._full is None
+        assert np.all(message.copy().data == values)
+    assert len(messages[0].get_data_points()) == len(expected[0])
+
+
+def test_filereader_lazy_write(tmp_path):
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        expected = [(m.get_buffer(), m.data) for m in reader if m["shortName"] == "t"][
+            :5
+        ]
+    path = tmp_path / "t.grib"
+    buffer = io.BytesIO()
+    with eccodes.FileReader(TEST_GRIB_DATA2, lazy=True) as reader:
+        selected = [m for m in reader if m["shortName"] == "t"][:5]
+        with eccodes.FileWriter(path) as writer:
+            writer.write_many(selected)
+        for message in selected:
+            message.write_to(buffer)
+    assert [m.get_buffer() for m in selected] == [b for b, _ in expected]
+    assert buffer.getvalue() == path.read_bytes()
+    with eccodes.FileReader(path) as reader:
+        for message, (_, values) in itertools.zip_longest(reader, expected):
+            assert np.array_equal(message.data, values)
+
+    # Setting keys in a lazy message reads its data section first
+    message = selected[0]
+    message.release_data()
+    message.set("level", 300)
+    assert not message.headers_only
+    decoded = eccodes.GRIBMessage(eccodes.codes_new_from_message(message.get_buffer()))
+    assert decoded["level"] == 300
+    assert np.array_equal(decoded.data, expected[0][1])
+
+
+def test_scan():
+    keys = ["shortName", "level", "step:float", "number:str", "nonexistent"]
+    columns = eccodes.scan(TEST_GRIB_DATA2, keys)
+    assert list(columns) == keys
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        messages = list(reader)
+    assert len(columns["shortName"]) == len(messages)
+    assert columns["shortName"].tolist() == [m["shortName"] for m in messages]
+    assert columns["level"].dtype == np.int64
+    assert columns["level"].tolist() == [m["level"] for m in messages]
+    assert columns["step:float"].dtype == np.float64
+    assert columns["number:str"][1] == "1"
+    assert np.ma.is_masked(columns["nonexistent"])
+    assert columns["nonexistent"].mask.all()
+
+    columns = eccodes.scan(
+        TEST_GRIB_DATA, ["shortName", "scaleFactorOfSecondFixedSurface"]
+    )
+    assert columns["shortName"][-1] == "lsp"
+    assert columns["scaleFactorOfSecondFixedSurface"].mask.all()
+
+    path = SAMPLE_DATA_FOLDER / "synop_multi_subset.bufr"
+    columns = eccodes.scan(path, ["edition"], eccodes.CODES_PRODUCT_BUFR)
+    assert columns["edition"].tolist() == [4]
+    with pytest.raises(ValueError):
+        eccodes.scan(TEST_GRIB_DATA, ["level:bool"])
+
+
+def test_message_get_many():
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        messages = list(reader)
+    keys = list(dict.fromkeys(messages[0].keys()))
+    keys += ["nonexistent", "scaleFactorOfSecondFixedSurface"]
+    for message in messages[:2]:
+        values = message.get_many(keys)
+        assert list(values) == keys
+        for key in keys:
+            assert np.all(values[key] == message.get(key)), key
+    values = messages[0].get_many(
+        ["centre:int", "centre", "level", "values"], ktype_map={"level": str}
+    )
+    assert values["centre:int"] == 250
+    assert values["centre"] == "cosmo"
+    assert values["level"] == "2"
+    assert len(values["values"]) == messages[0]["numberOfValues"]
+    with pytest.raises(ValueError):
+        messages[0].get_many(["centre:bool"])
+
+    with eccodes.FileReader(TEST_GRIB_DATA, lazy=True) as reader:
+        message = next(reader)
+        values = message.get_many(["shortName", "values"])
+    assert values["shortName"] == messages[0]["shortName"]
+    assert np.all(values["values"] == messages[0].data)
+
+
+def test_grib_get_data_arrays():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message = next(reader)
+        lats, lons, values = message.get_data_arrays()
+        assert np.array_equal(values, message.data)
+        points = message.get_data_points()
+    assert np.array_equal(lats, [p.lat for p in points])
+    assert np.array_equal(lons, [p.lon for p in points])
+
+
+def test_grib_nearest():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message = next(reader)
+        lats = np.array([51.5, 45.0, 60.2])
+        lons = np.array([-0.1, 10.0, 24.9])
+        nearest = message.nearest(lats, lons)
+        assert np.array_equal(nearest.value, message.data[nearest.index])
+        nearest4 = message.nearest(lats, lons, npoints=4)
+        assert nearest4.value.shape == (3, 4)
+        assert np.array_equal(nearest4.value, message.data[nearest4.index])
+        assert np.all(nearest4.distance.min(axis=1) == nearest.distance)
+
+
+def test_grib_nearest_plan():
+    lats = [51.5, 45.0, 60.2, 0.0]
+    lons = [-0.1, 10.0, 24.9, 0.0]
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message1 = next(reader)
+        message2 = next(reader)
+    plan = message1.nearest_plan(lats, lons)
+    assert message2.nearest_plan(lats, lons) is plan
+    assert np.array_equal(plan.apply(message2), message2.nearest(lats, lons).value)
+    assert np.array_equal(plan.apply(message2.data), plan.apply(message2))
+
+    plan4 = message1.nearest_plan(lats, lons, npoints=4)
+    assert plan4 is not plan
+    values = plan4.apply(message2)
+    assert values.shape == (4, 4)
+    assert np.array_equal(values, message2.nearest(lats, lons, npoints=4).value)
+    weighted = plan4.apply(message2, weighted=True)
+    assert weighted.shape == (4,)
+    assert np.all(weighted >= values.min(axis=1))
+    assert np.all(weighted <= values.max(axis=1))
+    assert np.allclose(plan4.weights.sum(axis=1), 1)
+    # (0, 0) is a grid point
+    assert weighted[3] == values[3][plan4.distance[3] == 0][0]
+
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        other = next(reader)
+    with pytest.raises(ValueError):
+        plan.apply(other)
+
+
+def test_grib_nearest_plan_missing():
+    message = eccodes.GRIBMessage.from_samples("regular_ll_sfc_grib2")
+    message.set("bitmapPresent", 1)
+    plan = message.nearest_plan([0.5, 10.0], [0.5, 10.0], npoints=4)
+    values = np.full(message["numberOfValues"], 280.0)
+    values[plan.index[0, np.argmin(plan.distance[0])]] = 9999
+    values[plan.index[1]] = 9999
+    message.set_array("values", values)
+    assert message["numberOfMissing"] == 5
+    weighted = plan.apply(message, weighted=True)
+    assert np.allclose(weighted, [280, 9999])
+    # Missing values of an array
+    values = np.where(values == 9999, np.nan, values)
+    weighted = plan.apply(values, weighted=True)
+    assert weighted[0] == pytest.approx(280)
+    assert np.isnan(weighted[1])
+    assert np.array_equal(
+        plan.apply(values, weighted=True, missing_value=280), [280, 280]
+    )
+
+
+def test_grib_grid():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message1 = next(reader)
+        message2 = next(reader)
+    lats, lons, _ = message1.get_data_arrays()
+    assert np.array_equal(message1.latitudes, lats)
+    assert np.array_equal(message1.longitudes, lons)
+    assert message2.grid is message1.grid
+    assert message2.latitudes is message1.latitudes
+    assert len(message1.grid) == message1["numberOfDataPoints"]
+    with pytest.raises(ValueError):
+        message1.latitudes[0] = 0
+
+    with eccodes.FileReader(TEST_GRIB_DATA, lazy=True) as reader:
+        message = next(reader)
+        assert message.grid.hash == message["md5GridSection"]
+        assert len(message.longitudes) == message["numberOfDataPoints"]
+        assert message.grid is not message1.grid
+
+
+def test_grib_float32():
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        expected = next(reader).data
+    with eccodes.FileReader(TEST_GRIB_DATA, dtype=np.float32) as reader:
+        message = next(reader)
+    assert message.dtype is np.float32
+    assert message.data.dtype == np.float32
+    assert np.allclose(message.data, expected)
+    assert message.get_array("values").dtype == np.float32
+    assert message.get_array("codedValues").dtype == np.float32
+    assert message.get_array("values", dtype="float64").dtype == np.float64
+    assert message.copy().data.dtype == np.float32
+    with pytest.raises(ValueError):
+        message.get_array("values", dtype=np.int32)
+
+    values = message.data + 1
+    message.set_array("values", values)
+    message.release_data()
+    assert np.allclose(message.data, values)
+
+    with eccodes.FileReader(TEST_GRIB_DATA, lazy=True, dtype=np.float32) as reader:
+        message = next(reader)
+        assert message.get_array("values").dtype == np.float32
+        assert message.data.dtype == np.float32
+    with pytest.raises(ValueError):
+        eccodes.FileReader(TEST_GRIB_DATA, eccodes.CODES_PRODUCT_BUFR, dtype=np.float32)
+
+
+def test_grib_read_values_into():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        messages = list(itertools.islice(reader, 5))
+    cube = np.empty((len(messages), messages[0]["numberOfValues"]), np.float32)
+    for row, message in zip(cube, messages):
+        assert message.read_values_into(row) is row
+    for row, message in zip(cube, messages):
+        assert np.array_equal(row, message.get_array("values", dtype=np.float32))
+
+
+def test_get_buffer_no_copy():
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        message = next(reader)
+        view = message.get_buffer(copy=False)
+        assert isinstance(view, memoryview) and view.readonly
+        assert view.tobytes() == message.get_buffer()
+        buffer = io.BytesIO()
+        message.write_to(buffer)
+        assert buffer.getvalue() == message.get_buffer()
+
+
+@pytest.mark.parametrize("buffer_size", [0, 1 << 20])
+@pytest.mark.parametrize("copy", [True, False])
+def test_file_writer(tmp_path, buffer_size, copy):
+    path = tmp_path / "out.grib"
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        messages = list(reader)
+    with eccodes.FileWriter(path, buffer_size=buffer_size, copy=copy) as writer:
+        assert writer.write(messages[0]) == 0
+        assert writer.write_many(messages[1:]) == len(messages) - 1
+        index = writer.save_index()
+    assert writer.closed
+    assert path.read_bytes() == TEST_GRIB_DATA.read_bytes()
+    expected = eccodes.Index.build(path)
+    assert index.entries == expected.entries
+    loaded = eccodes.Index.load(tmp_path / "out.grib.idx", path)
+    assert loaded is not None
+    assert loaded.entries == expected.entries
+    with pytest.raises(ValueError):
+        writer.write(messages[0])
+
+
+def test_file_writer_reused_message(tmp_path):
+    path = tmp_path / "out.grib"
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message = next(reader)
+    values = np.zeros(message["numberOfValues"])
+    with eccodes.FileWriter(path) as writer:
+        for level in (1, 2, 3):
+            message.set("level", level)
+            message.set_array("values", values + level)
+            writer.write(message)
+    with eccodes.FileReader(path) as reader:
+        written = [(m["level"], m.data[0]) for m in reader]
+    assert written == [(1, 1.0), (2, 2.0), (3, 3.0)]
+
+
+def test_file_writer_bufr(tmp_path):
+    source = SAMPLE_DATA_FOLDER / "synop_multi_subset.bufr"
+    path = tmp_path / "out.bufr"
+    with eccodes.FileReader(source, eccodes.CODES_PRODUCT_BUFR) as reader:
+        with eccodes.FileWriter(
+            path, eccodes.CODES_PRODUCT_BUFR, fsync=True, index_keys=["edition"]
+        ) as writer:
+            messages = list(reader)
+            writer.write_many(messages)
+            index = writer.index()
+    assert path.read_bytes() == b"".join(m.get_buffer() for m in messages)
+    assert [entry.header for entry in index] == [{"edition": 4}] * len(index)
+    assert (
+        index.offsets == eccodes.Index.build(path, eccodes.CODES_PRODUCT_BUFR).offsets
+    )
+
+
+def test_encode_many():
+    with eccodes.FileReader(TEST_GRIB_DATA) as reader:
+        template = next(reader)
+    rng = np.random.default_rng(0)
+    arrays = [rng.uniform(0, 100, template["numberOfValues"]) for _ in range(3)]
+    arrays[2] = arrays[2].astype(np.float32)
+    buffers = eccodes.encode_many(template, arrays, {"bitsPerValue": 24}, workers=2)
+    assert len(buffers) == 3
+    for buffer, values in zip(buffers, arrays):
+        message = eccodes.GRIBMessage(eccodes.codes_new_from_message(buffer))
+        assert message["bitsPerValue"] == 24
+        assert message["shortName"] == template["shortName"]
+        assert np.allclose(message.data, values, rtol=1e-5, atol=1e-3)
+
+    overrides = [{"level": 10}, {"level": 20}, {"level": 30}]
+    buffers = eccodes.encode_many(template, iter(arrays), overrides)
+    levels = [
+        eccodes.GRIBMessage(eccodes.codes_new_from_message(b))["level"] for b in buffers
+    ]
+    assert levels == [10, 20, 30]
+    with pytest.raises(ValueError):
+        eccodes.encode_many(template, arrays, overrides[:2])
+
+
+def test_grib_copy_headers_only_and_derive():
+    with eccodes.FileReader(TEST_GRIB_DATA2) as reader:
+        message = next(reader)
+    header = message.copy(headers_only=True)
+    assert header.headers_only
+    assert header["shortName"] == message["shortName"]
+    with pytest.raises(ValueError):
+        header.data
+    with pytest.raises(ValueError):
+        header.get_buffer()
+
+    values = np.linspace(0, 1, message["numberOfValues"])
+    derived = message.derive(values, level=850)
+    assert not derived.headers_only
+    assert derived["level"] == 850
+    assert message["level"] == 500
+    assert np.allclose(derived.data, values, atol=1e-3)
+    template = message._template
+    assert message.derive(level=1000)["level"] == 1000
+    assert message._template is template
+    message.set("level", 700)
+    assert message._template is None
+    assert message.derive(values)["level"] == 700
+
+
+def test_grib_derive_lazy():
+    with eccodes.FileReader(TEST_GRIB_DATA2, lazy=True) as reader:
+        message = next(reader)
+    values = np.linspace(0, 1, message["numberOfValues"])
+    derived = message.derive(values, level=10)
+    assert derived["level"] == 10
+    assert derived["shortName"] == message["shortName"]
+    assert np.allclose(derived.data, values, atol=1e-3)
+    assert message._full is None
+    copy = message.copy()
+    assert copy.headers_only and copy["level"] == 500
+
+    with eccodes.FileReader(TEST_GRIB_DATA, headers_only=True) as reader:
+        message = next(reader)
+    values = np.linspace(0, 1, 212065)
+    derived = message.derive(values, level=10)
+    assert derived["level"] == 10
+    assert np.allclose(derived.data, values, atol=1e-3)
+
+    with eccodes.FileReader(TEST_GRIB_DATA2, headers_only=True) as reader:
+        message = next(reader)
+    with pytest.raises(ValueError):
+        message.derive(values, level=10)